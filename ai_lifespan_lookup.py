@@ -4,17 +4,283 @@ AI-Powered Part Lifespan Lookup - Fixed Version
 Uses AI to get accurate lifespan data without external APIs
 """
 
+import asyncio
+import hashlib
 import json
 import os
-from typing import Dict, Optional
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, List, Optional
 from dotenv import load_dotenv
 import logging
-import openai
 import re
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential_jitter
+from openai_clients import new_async_openai_client, new_openai_client
+
+# openai (and httpx under it) are imported on first use: they dominate import time,
+# and lookups answered from the caches or rules never need them
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI, OpenAI
 
 load_dotenv()
 logger = logging.getLogger(__name__)
 
+def _compile_keywords(*keywords: str) -> re.Pattern:
+    """Compile a keyword list into a single substring alternation"""
+    return re.compile("|".join(re.escape(word) for word in keywords))
+
+# Category detection rules, tested in order (first match wins)
+_CATEGORY_PATTERNS = [
+    # Filters (air, oil, fuel, hydraulic, etc.)
+    ("filter", _compile_keywords(
+        "filter", "filtro", "air filter", "oil filter", "fuel filter",
+        "hydraulic filter", "cabin filter", "element"
+    )),
+    # Bearings
+    ("bearing", _compile_keywords(
+        "bearing", "cuscinetto", "ball bearing", "roller bearing",
+        "thrust bearing", "pillow block"
+    )),
+    # Belts
+    ("belt", _compile_keywords(
+        "belt", "cintura", "v-belt", "serpentine", "timing belt",
+        "drive belt", "fan belt"
+    )),
+    # Sensors
+    ("sensor", _compile_keywords(
+        "sensor", "sensore", "temperature sensor", "pressure sensor",
+        "proximity sensor", "level sensor", "flow sensor"
+    )),
+    # Motors and pumps
+    ("motor", _compile_keywords(
+        "motor", "motore", "pump", "pompa", "electric motor",
+        "hydraulic pump", "gear pump"
+    )),
+    # Seals and gaskets
+    ("seal", _compile_keywords(
+        "seal", "gasket", "guarnizione", "o-ring", "oil seal",
+        "hydraulic seal", "shaft seal"
+    )),
+    # Electrical components
+    ("electrical", _compile_keywords(
+        "switch", "relay", "contactor", "fuse", "circuit breaker",
+        "transformer", "capacitor"
+    )),
+    # Hydraulic components
+    ("hydraulic", _compile_keywords(
+        "hydraulic", "cylinder", "valve", "hose", "fitting",
+        "accumulator"
+    )),
+]
+
+# Fallback lifespan rules in months, tested in order (first match wins)
+_FALLBACK_PATTERNS = [
+    (_compile_keywords("air filter", "engine air", "cabin filter"), 6),  # Air filters - 6 months
+    (_compile_keywords("oil filter", "hydraulic filter", "fuel filter"), 6),  # Fluid filters - 6 months
+    (_compile_keywords("filter", "filtro", "element"), 6),  # Generic filters - 6 months
+    (_compile_keywords("bearing", "cuscinetto", "ball bearing", "roller"), 36),  # Bearings - 36 months
+    (_compile_keywords("belt", "cintura", "v-belt", "serpentine", "timing"), 18),  # Belts - 18 months
+    (_compile_keywords("sensor", "sensore", "temperature", "pressure"), 30),  # Sensors - 30 months
+    (_compile_keywords("motor", "motore", "pump", "pompa"), 60),  # Motors/pumps - 60 months
+    (_compile_keywords("seal", "gasket", "guarnizione", "o-ring"), 24),  # Seals - 24 months
+    (_compile_keywords("switch", "relay", "contactor", "electrical"), 36),  # Electrical - 36 months
+    (_compile_keywords("hydraulic", "cylinder", "valve", "hose"), 30),  # Hydraulic - 30 months
+]
+
+# Fallback lifespan when no rule matches - 18 months
+_DEFAULT_FALLBACK_MONTHS = 18
+
+# Specific part subtypes with well-established intervals; these are answered
+# from the table directly instead of asking the AI
+_STANDARD_PATTERNS = [
+    (_compile_keywords("air filter", "engine air", "cabin filter"), 6),  # Air filters - 6 months
+    (_compile_keywords("oil filter", "hydraulic filter", "fuel filter"), 6),  # Fluid filters - 6 months
+    (_compile_keywords("v-belt", "serpentine", "timing belt", "fan belt"), 18),  # Belts - 18 months
+    (_compile_keywords("o-ring", "gasket", "guarnizione"), 24),  # Seals - 24 months
+]
+
+_NUM_RE = re.compile(r"\d+")
+
+def _normalize(name: str) -> str:
+    """Normalized form of a part name used by the keyword tables"""
+    return name.lower()
+
+def _categorize_lower(name_lower: str) -> str:
+    """Category of an already-normalized part name"""
+    for category, pattern in _CATEGORY_PATTERNS:
+        if pattern.search(name_lower):
+            return category
+    
+    return "general"
+
+def _standard_lower(name_lower: str) -> Optional[int]:
+    """Standard lifespan for a well-known part subtype, or None if the AI should decide"""
+    for pattern, months in _STANDARD_PATTERNS:
+        if pattern.search(name_lower):
+            return months
+    
+    return None
+
+def _fallback_lower(name_lower: str) -> int:
+    """Fallback lifespan in months for an already-normalized part name"""
+    for pattern, months in _FALLBACK_PATTERNS:
+        if pattern.search(name_lower):
+            return months
+    
+    return _DEFAULT_FALLBACK_MONTHS
+
+# Maximum number of AI lifespan answers kept in memory per lookup instance
+_CACHE_SIZE = 4096
+
+# Persistent cache of AI answers, so lifespans survive across runs (same file as the agent's online cache)
+_PERSISTENT_CACHE_PATH = 'lifespan_cache.sqlite'
+_PERSISTENT_CACHE_TTL_SECONDS = 30 * 24 * 3600
+
+# Single-digit token ids "0".."9" in cl100k_base (the gpt-3.5-turbo tokenizer).
+# The bias nudges the model towards a bare number; it is kept moderate so the
+# end-of-answer token can still win after the last digit.
+_DIGIT_LOGIT_BIAS = {str(token_id): 5 for token_id in range(15, 25)}
+
+# Request parameters shared by online and batch lifespan lookups; a lifespan of
+# up to 3 digits fits in 3 single-digit tokens
+_COMPLETION_PARAMS = {
+    "model": "gpt-3.5-turbo",
+    "temperature": 0.0,  # Lower temperature for more consistent results
+    "max_tokens": 3,
+    "stop": ["\n"],
+    "logit_bias": _DIGIT_LOGIT_BIAS
+}
+
+# Connection pool shared by OpenAI clients (keep-alive connections are reused across calls)
+_HTTP_LIMITS = {"max_connections": 64, "max_keepalive_connections": 32}
+_HTTP_TIMEOUT = 10
+
+_client: Optional["OpenAI"] = None
+_client_lock = threading.Lock()
+
+def _get_client() -> "OpenAI":
+    """Module-level OpenAI client, created on first use and shared by all lookups"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            # Retries are handled by _openai_retry, so the client's own retries are disabled
+            _client = new_openai_client(limits=_HTTP_LIMITS, timeout=_HTTP_TIMEOUT, max_retries=0)
+        return _client
+
+def _new_async_client() -> "AsyncOpenAI":
+    """AsyncOpenAI client with the lookup pool settings, for the calling event loop"""
+    return new_async_openai_client(limits=_HTTP_LIMITS, timeout=_HTTP_TIMEOUT, max_retries=0)
+
+_db: Optional[sqlite3.Connection] = None
+_db_lock = threading.Lock()
+
+def _get_db() -> sqlite3.Connection:
+    """Module-level connection to the persistent cache, opened on first use; callers hold _db_lock"""
+    global _db
+    if _db is None:
+        _db = sqlite3.connect(_PERSISTENT_CACHE_PATH, timeout=10, check_same_thread=False)
+        _db.execute("CREATE TABLE IF NOT EXISTS ai_lifespans (hash TEXT PRIMARY KEY, months INTEGER, ts INTEGER)")
+    return _db
+
+def _persistent_key(key: tuple) -> str:
+    """SHA-256 of a normalized cache key plus the model, so a model change starts a fresh cache"""
+    fields = [str(field or '').lower().strip() for field in key] + [_COMPLETION_PARAMS["model"]]
+    return hashlib.sha256("\x1f".join(fields).encode()).hexdigest()
+
+class _RateLimiter:
+    """Token bucket spacing OpenAI requests to stay under a requests-per-minute budget"""
+    
+    def __init__(self, requests_per_minute: int):
+        self.capacity = requests_per_minute
+        self.rate = requests_per_minute / 60.0
+        self.tokens = float(requests_per_minute)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def reserve(self) -> float:
+        """Take one request slot; returns the seconds to wait before sending"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+_RATE_LIMITER = _RateLimiter(int(os.getenv("OPENAI_REQUESTS_PER_MINUTE", "3500")))
+
+def _is_transient(error: BaseException) -> bool:
+    """True for OpenAI failures worth retrying: 429s, dropped connections and timeouts, 5xx"""
+    import openai
+    return isinstance(error, (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError))
+
+# Retry transient OpenAI failures with jittered backoff
+_openai_retry = retry(
+    stop=stop_after_attempt(5),
+    wait=wait_exponential_jitter(initial=1, max=30),
+    retry=retry_if_exception(_is_transient),
+    reraise=True
+)
+
+def _answer_complete(answer: str, token: str) -> bool:
+    """True once a numeric answer has been read and the next token is not a digit"""
+    return answer.strip().isdigit() and not token.strip().isdigit()
+
+@_openai_retry
+def _create_completion(messages: List[Dict]) -> str:
+    """
+    Rate-limited, retried chat completion for a lifespan request
+    The reply is streamed and returned as soon as the number is complete.
+    """
+    time.sleep(_RATE_LIMITER.reserve())
+    answer = ""
+    with _get_client().chat.completions.create(messages=messages, stream=True, **_COMPLETION_PARAMS) as stream:
+        for chunk in stream:
+            token = (chunk.choices[0].delta.content or "") if chunk.choices else ""
+            if _answer_complete(answer, token):
+                break
+            answer += token
+    return answer
+
+@_openai_retry
+async def _acreate_completion(client: "AsyncOpenAI", messages: List[Dict]) -> str:
+    """Async variant of _create_completion"""
+    await asyncio.sleep(_RATE_LIMITER.reserve())
+    answer = ""
+    async with await client.chat.completions.create(messages=messages, stream=True, **_COMPLETION_PARAMS) as stream:
+        async for chunk in stream:
+            token = (chunk.choices[0].delta.content or "") if chunk.choices else ""
+            if _answer_complete(answer, token):
+                break
+            answer += token
+    return answer
+
+# Static system prompt (role, rules and all category reference intervals) so the
+# prefix is identical on every call and per-part prompts stay a single line
+_SYSTEM_PROMPT = """You are a professional maintenance engineer with 20+ years of experience.
+Your job is to provide accurate maintenance/replacement intervals for industrial parts.
+
+RULES:
+- Always give a specific number of months; never answer "UNKNOWN" or "I don't know"
+- Base the answer on manufacturer specifications, industry best practice, equipment type,
+  industrial operating conditions and safety requirements
+- If unsure, give the most reasonable estimate for similar parts
+- Respond with ONLY the number (e.g. "12" for 12 months), no other text
+
+REFERENCE INTERVALS (months) BY CATEGORY:
+filter: air 3-12, oil 3-6, fuel 6-12, hydraulic 6-18, cabin 6-12
+bearing: ball 24-60, roller 36-72, thrust 24-48, sealed 36-60, high-speed 12-24
+belt: V-belt 12-24, serpentine 18-36, timing 24-48, drive 12-24, heavy-duty 18-30
+sensor: temperature 24-48, pressure 24-36, proximity 36-60, level 18-36, flow 24-48
+motor: electric motor 60-120, hydraulic pump 36-72, gear pump 24-48, servo 48-84, stepper 36-60
+seal: O-ring 12-24, oil seal 18-36, hydraulic seal 12-24, gasket 12-36, shaft seal 18-30
+electrical: switch 24-48, relay 24-60, contactor 36-72, circuit breaker 60-120, fuse inspect yearly
+hydraulic: cylinder 36-72, valve 24-48, hose 12-24, fitting 24-60, accumulator 36-72
+general: mechanical 12-36, wear parts 6-18, structural 36-120, consumables 3-12, safety 12-24
+
+Each request is one line: Part | Machine | Mfr (manufacturer) | PN (part number) | Cat (category)."""
+
 class AILifespanLookup:
     """
     AI-powered lifespan lookup using intelligent prompts
@@ -23,65 +289,332 @@ class AILifespanLookup:
     def __init__(self):
         self.openai_key = os.getenv("OPENAI_API_KEY")
         if self.openai_key:
-            openai.api_key = self.openai_key
             self.use_openai = True
         else:
             self.use_openai = False
             logger.warning("No OpenAI API key found. Using fallback responses.")
+        
+        # LRU cache of AI answers keyed by (part_name, machine_name, manufacturer, part_number)
+        self._lifespan_cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        
+        # Async lookups currently waiting on OpenAI, keyed by (event loop, cache key)
+        # so concurrent requests for the same part share a single call
+        self._inflight = {}
     
     def get_ai_lifespan(self, part_name: str, machine_name: str, manufacturer: str = None, part_number: str = None) -> Optional[int]:
         """
         Get part lifespan using AI analysis
         Returns lifespan in months
         """
-        logger.info(f"🔍 AI analyzing lifespan for: {part_name}")
+        logger.info("🔍 AI analyzing lifespan for: %s", part_name)
         
         if not self.use_openai:
             logger.warning("No OpenAI API key found. Using fallback lifespan.")
             return self._get_fallback_lifespan(part_name)
         
+        # Normalize once for the standard-interval check, prompt category and any fallback
+        name_lower = _normalize(part_name)
+        standard = _standard_lower(name_lower)
+        if standard:
+            logger.info("📋 Standard lifespan for %s: %s months", part_name, standard)
+            return standard
+        
+        cache_key = (part_name, machine_name, manufacturer, part_number)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return cached
+        
         try:
-            # Create intelligent prompt based on part type
-            prompt = self._create_intelligent_prompt(part_name, machine_name, manufacturer, part_number)
+            answer = _create_completion(
+                self._create_messages(part_name, machine_name, manufacturer, part_number, _categorize_lower(name_lower))
+            )
             
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {
-                        "role": "system", 
-                        "content": """You are a professional maintenance engineer with 20+ years of experience. 
-                        Your job is to provide accurate maintenance intervals for industrial parts.
-                        
-                        CRITICAL INSTRUCTIONS:
-                        - You MUST provide a specific number of months
-                        - NEVER respond with "UNKNOWN" or "I don't know"
-                        - Base your answer on industry standards and manufacturer recommendations
-                        - If you're unsure, provide the most reasonable estimate based on similar parts
-                        - Response format: ONLY the number (e.g., "12" for 12 months)
-                        - No explanations, no additional text, just the number"""
-                    },
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.0,  # Lower temperature for more consistent results
-                max_tokens=10
+            lifespan = self._handle_ai_result(answer, name_lower)
+            self._cache_put(cache_key, lifespan)
+            return lifespan
+            
+        except Exception as e:
+            logger.error("AI analysis error: %s", e)
+            return _fallback_lower(name_lower)
+    
+    async def get_ai_lifespan_async(self, part_name: str, machine_name: str, manufacturer: str = None, part_number: str = None, client: Optional["AsyncOpenAI"] = None, part_type: str = None) -> Optional[int]:
+        """
+        Async variant of get_ai_lifespan, so many parts can be looked up concurrently
+        Pass an AsyncOpenAI client to share one connection pool across lookups, and the part's
+        category if already known (see categorize_parts).
+        Returns lifespan in months
+        """
+        logger.debug("🔍 AI analyzing lifespan for: %s", part_name)
+        
+        if not self.use_openai:
+            return self._get_fallback_lifespan(part_name)
+        
+        name_lower = _normalize(part_name)
+        standard = _standard_lower(name_lower)
+        if standard:
+            logger.debug("📋 Standard lifespan for %s: %s months", part_name, standard)
+            return standard
+        
+        cache_key = (part_name, machine_name, manufacturer, part_number)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return cached
+        
+        if client is None:
+            async with _new_async_client() as client:
+                return await self.get_ai_lifespan_async(part_name, machine_name, manufacturer, part_number, client, part_type)
+        
+        loop = asyncio.get_running_loop()
+        inflight_key = (loop, cache_key)
+        pending = self._inflight.get(inflight_key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+        
+        future = loop.create_future()
+        self._inflight[inflight_key] = future
+        try:
+            answer = await _acreate_completion(
+                client,
+                self._create_messages(part_name, machine_name, manufacturer, part_number, part_type or _categorize_lower(name_lower))
             )
             
-            result = response.choices[0].message.content.strip()
-            logger.info(f"🤖 AI Response: '{result}'")
+            lifespan = self._handle_ai_result(answer, name_lower)
+            self._cache_put(cache_key, lifespan)
             
-            # Enhanced parsing to extract numbers
-            lifespan = self._parse_lifespan_response(result)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            logger.error("AI analysis error: %s", e)
+            lifespan = _fallback_lower(name_lower)
+        finally:
+            del self._inflight[inflight_key]
+        
+        future.set_result(lifespan)
+        return lifespan
+    
+    async def get_ai_lifespan_batch(self, parts: List[Dict], concurrency: int = 32) -> List[Optional[int]]:
+        """
+        Look up lifespans for many parts concurrently
+        Each part is a dict with part_name, machine_name and optional manufacturer/part_number.
+        Returns lifespans in months, in the same order as parts
+        """
+        if not self.use_openai:
+            return [self._get_fallback_lifespan(part["part_name"]) for part in parts]
+        
+        # Parts answered by the standard intervals or the caches need no client (nor the openai import)
+        lifespans = [self._known_lifespan(part) for part in parts]
+        pending = [i for i, lifespan in enumerate(lifespans) if lifespan is None]
+        logger.info("🔍 AI lifespans for %s parts: %s known, %s to look up", len(parts), len(parts) - len(pending), len(pending))
+        if not pending:
+            return lifespans
+        
+        semaphore = asyncio.Semaphore(concurrency)
+        categories = self.categorize_parts([parts[i]["part_name"] for i in pending])
+        
+        async with _new_async_client() as client:
+            async def lookup(part: Dict, part_type: str) -> Optional[int]:
+                async with semaphore:
+                    return await self.get_ai_lifespan_async(
+                        part["part_name"],
+                        part.get("machine_name", ""),
+                        part.get("manufacturer"),
+                        part.get("part_number"),
+                        client,
+                        part_type
+                    )
             
-            if lifespan:
-                logger.info(f"✅ AI found lifespan: {lifespan} months")
-                return lifespan
-            else:
-                logger.warning(f"Could not parse AI response: '{result}', using fallback")
-                return self._get_fallback_lifespan(part_name)
+            found = await asyncio.gather(*(lookup(parts[i], part_type) for i, part_type in zip(pending, categories)))
+        
+        for i, lifespan in zip(pending, found):
+            lifespans[i] = lifespan
+        return lifespans
+    
+    def _known_lifespan(self, part: Dict) -> Optional[int]:
+        """A part's standard or cached lifespan, without calling OpenAI; None if it needs a lookup"""
+        standard = _standard_lower(_normalize(part["part_name"]))
+        if standard:
+            return standard
+        return self._cache_get((part["part_name"], part.get("machine_name", ""), part.get("manufacturer"), part.get("part_number")))
+    
+    def get_ai_lifespans(self, parts: List[Dict], concurrency: int = 32) -> List[Optional[int]]:
+        """Synchronous entry point for get_ai_lifespan_batch"""
+        return asyncio.run(self.get_ai_lifespan_batch(parts, concurrency))
+    
+    def submit_batch(self, parts: List[Dict]) -> Optional[str]:
+        """
+        Submit lifespan requests for many parts through the OpenAI Batch API
+        Cheaper than per-part calls, meant for offline refreshes (24h completion window).
+        Returns the batch id, or None if the batch could not be created
+        """
+        if not self.use_openai:
+            logger.warning("No OpenAI API key found. Cannot submit batch.")
+            return None
+        
+        lines = []
+        categories = self.categorize_parts([part["part_name"] for part in parts])
+        for i, (part, part_type) in enumerate(zip(parts, categories)):
+            lines.append(json.dumps({
+                "custom_id": str(part.get("part_id", i)),
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "messages": self._create_messages(
+                        part["part_name"],
+                        part.get("machine_name", ""),
+                        part.get("manufacturer"),
+                        part.get("part_number"),
+                        part_type
+                    ),
+                    **_COMPLETION_PARAMS
+                }
+            }))
+        
+        client = _get_client()
+        try:
+            upload = client.files.create(
+                file=("lifespans.jsonl", "\n".join(lines).encode("utf-8")),
+                purpose="batch"
+            )
+            batch = client.batches.create(
+                input_file_id=upload.id,
+                endpoint="/v1/chat/completions",
+                completion_window="24h"
+            )
+        except Exception as e:
+            logger.error("Batch submission error: %s", e)
+            return None
+        
+        batch_id = batch.id
+        logger.info("📦 Submitted lifespan batch %s for %s parts", batch_id, len(parts))
+        return batch_id
+    
+    def collect_batch(self, batch_id: str, parts: List[Dict]) -> Optional[Dict[str, int]]:
+        """
+        Fetch the results of a batch created by submit_batch with the same parts
+        Results are stored in the lifespan cache so later get_ai_lifespan calls are served locally.
+        Returns lifespans by custom_id, or None while the batch is still running
+        """
+        client = _get_client()
+        try:
+            batch = client.batches.retrieve(batch_id)
             
+            if batch.status != "completed":
+                logger.info("⏳ Lifespan batch %s is %s", batch_id, batch.status)
+                return None
+            
+            output = client.files.content(batch.output_file_id)
         except Exception as e:
-            logger.error(f"AI analysis error: {e}")
-            return self._get_fallback_lifespan(part_name)
+            logger.error("Batch retrieval error: %s", e)
+            return None
+        
+        parts_by_id = {str(part.get("part_id", i)): part for i, part in enumerate(parts)}
+        lifespans = {}
+        for line in output.text.splitlines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            part = parts_by_id.get(record["custom_id"])
+            body = (record.get("response") or {}).get("body")
+            if not part or not body:
+                continue
+            
+            lifespan = self._parse_lifespan_response(body["choices"][0]["message"]["content"])
+            if lifespan:
+                lifespans[record["custom_id"]] = lifespan
+                self._cache_put(
+                    (part["part_name"], part.get("machine_name", ""), part.get("manufacturer"), part.get("part_number")),
+                    lifespan
+                )
+        
+        logger.info("✅ Collected %s lifespans from batch %s", len(lifespans), batch_id)
+        return lifespans
+    
+    def _cache_get(self, key: tuple) -> Optional[int]:
+        """Return a cached lifespan and mark it as recently used, falling back to the persistent cache"""
+        with self._cache_lock:
+            lifespan = self._lifespan_cache.get(key)
+            if lifespan is not None:
+                self._lifespan_cache.move_to_end(key)
+                return lifespan
+        
+        try:
+            with _db_lock:
+                row = _get_db().execute(
+                    "SELECT months FROM ai_lifespans WHERE hash = ? AND ts > ?",
+                    (_persistent_key(key), int(time.time()) - _PERSISTENT_CACHE_TTL_SECONDS)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.error("❌ Error reading lifespan cache: %s", e)
+            return None
+        
+        if row:
+            self._remember(key, row[0])
+            return row[0]
+        return None
+    
+    def _cache_put(self, key: tuple, lifespan: int):
+        """Store a lifespan in memory and in the persistent cache"""
+        self._remember(key, lifespan)
+        try:
+            with _db_lock:
+                db = _get_db()
+                with db:
+                    db.execute(
+                        "INSERT OR REPLACE INTO ai_lifespans (hash, months, ts) VALUES (?, ?, ?)",
+                        (_persistent_key(key), lifespan, int(time.time()))
+                    )
+        except sqlite3.Error as e:
+            logger.error("❌ Error writing lifespan cache: %s", e)
+    
+    def _remember(self, key: tuple, lifespan: int):
+        """Keep a lifespan in memory, evicting the least recently used entry when full"""
+        with self._cache_lock:
+            self._lifespan_cache[key] = lifespan
+            self._lifespan_cache.move_to_end(key)
+            if len(self._lifespan_cache) > _CACHE_SIZE:
+                self._lifespan_cache.popitem(last=False)
+    
+    def clear_cache(self):
+        """Forget all cached AI answers, in memory and on disk"""
+        with self._cache_lock:
+            self._lifespan_cache.clear()
+        try:
+            with _db_lock:
+                db = _get_db()
+                with db:
+                    db.execute("DELETE FROM ai_lifespans")
+        except sqlite3.Error as e:
+            logger.error("❌ Error clearing lifespan cache: %s", e)
+    
+    def _create_messages(self, part_name: str, machine_name: str, manufacturer: str = None, part_number: str = None, part_type: str = None) -> List[Dict]:
+        """Build the chat messages for a lifespan request"""
+        # Create intelligent prompt based on part type
+        prompt = self._create_intelligent_prompt(part_name, machine_name, manufacturer, part_number, part_type)
+        
+        return [
+            {"role": "system", "content": _SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
+    
+    def _handle_ai_result(self, content: str, name_lower: str) -> int:
+        """Parse the AI answer, falling back to the rule-based lifespan"""
+        result = content.strip()
+        logger.debug("🤖 AI Response: '%s'", result)
+        
+        # Answers are constrained to digits, so the plain int() path is the common case
+        if result.isdigit():
+            lifespan = int(result)
+        else:
+            lifespan = self._parse_lifespan_response(result)
+        
+        if lifespan:
+            logger.debug("✅ AI found lifespan: %s months", lifespan)
+            return lifespan
+        else:
+            logger.warning("Could not parse AI response: '%s', using fallback", result)
+            return _fallback_lower(name_lower)
     
     def _parse_lifespan_response(self, response: str) -> Optional[int]:
         """Parse AI response to extract lifespan number"""
@@ -93,236 +626,38 @@ class AILifespanLookup:
             return int(cleaned)
         
         # Extract numbers from text
-        numbers = re.findall(r'\d+', cleaned)
-        if numbers:
+        match = _NUM_RE.search(cleaned)
+        if match:
             # Take the first number found
-            return int(numbers[0])
+            return int(match.group())
         
         # If no numbers found, return None
         return None
     
-    def _create_intelligent_prompt(self, part_name: str, machine_name: str, manufacturer: str = None, part_number: str = None) -> str:
-        """Create intelligent prompt based on part type and context"""
+    def _create_intelligent_prompt(self, part_name: str, machine_name: str, manufacturer: str = None, part_number: str = None, part_type: str = None) -> str:
+        """Create the per-part prompt; reference intervals live in the system prompt"""
+        part_type = part_type or self._categorize_part(part_name)
         
-        # Analyze part type
-        part_type = self._categorize_part(part_name)
-        
-        # Get context-specific examples
-        examples = self._get_lifespan_examples(part_type)
-        
-        # Build comprehensive prompt
-        prompt = f"""
-MAINTENANCE INTERVAL REQUEST:
-
-Part Details:
-- Part Name: {part_name}
-- Machine/Equipment: {machine_name}
-- Manufacturer: {manufacturer or 'Industrial standard'}
-- Part Number: {part_number or 'N/A'}
-
-Part Category: {part_type.title()}
-
-Industry Standards for {part_type}:
-{examples}
-
-TASK: Determine the recommended maintenance/replacement interval for this specific part.
-
-Consider:
-1. Manufacturer specifications (if known)
-2. Industry best practices
-3. Equipment type and usage
-4. Environmental conditions (industrial use)
-5. Safety requirements
-
-Provide the interval in MONTHS only. Examples of good responses:
-- "6" (for 6 months)
-- "12" (for 12 months)
-- "24" (for 24 months)
-
-Your response (number only):"""
-        
-        return prompt
+        return f"Part: {part_name} | Machine: {machine_name} | Mfr: {manufacturer or 'Industrial standard'} | PN: {part_number or 'N/A'} | Cat: {part_type}"
     
     def _categorize_part(self, part_name: str) -> str:
         """Categorize part based on name with expanded detection"""
-        part_name_lower = part_name.lower()
-        
-        # Filters (air, oil, fuel, hydraulic, etc.)
-        if any(word in part_name_lower for word in [
-            "filter", "filtro", "air filter", "oil filter", "fuel filter", 
-            "hydraulic filter", "cabin filter", "element"
-        ]):
-            return "filter"
-        
-        # Bearings
-        elif any(word in part_name_lower for word in [
-            "bearing", "cuscinetto", "ball bearing", "roller bearing", 
-            "thrust bearing", "pillow block"
-        ]):
-            return "bearing"
-        
-        # Belts
-        elif any(word in part_name_lower for word in [
-            "belt", "cintura", "v-belt", "serpentine", "timing belt", 
-            "drive belt", "fan belt"
-        ]):
-            return "belt"
-        
-        # Sensors
-        elif any(word in part_name_lower for word in [
-            "sensor", "sensore", "temperature sensor", "pressure sensor", 
-            "proximity sensor", "level sensor", "flow sensor"
-        ]):
-            return "sensor"
-        
-        # Motors and pumps
-        elif any(word in part_name_lower for word in [
-            "motor", "motore", "pump", "pompa", "electric motor", 
-            "hydraulic pump", "gear pump"
-        ]):
-            return "motor"
-        
-        # Seals and gaskets
-        elif any(word in part_name_lower for word in [
-            "seal", "gasket", "guarnizione", "o-ring", "oil seal", 
-            "hydraulic seal", "shaft seal"
-        ]):
-            return "seal"
-        
-        # Electrical components
-        elif any(word in part_name_lower for word in [
-            "switch", "relay", "contactor", "fuse", "circuit breaker", 
-            "transformer", "capacitor"
-        ]):
-            return "electrical"
-        
-        # Hydraulic components
-        elif any(word in part_name_lower for word in [
-            "hydraulic", "cylinder", "valve", "hose", "fitting", 
-            "accumulator"
-        ]):
-            return "hydraulic"
-        
-        else:
-            return "general"
-    
-    def _get_lifespan_examples(self, part_type: str) -> str:
-        """Get industry standard examples for each part type"""
-        examples = {
-            "filter": """
-- Air filters: 3-12 months (depending on environment)
-- Oil filters: 3-6 months or per oil change
-- Fuel filters: 6-12 months
-- Hydraulic filters: 6-18 months
-- Cabin filters: 6-12 months
-""",
-            "bearing": """
-- Ball bearings: 24-60 months (industrial use)
-- Roller bearings: 36-72 months
-- Thrust bearings: 24-48 months
-- Sealed bearings: 36-60 months
-- High-speed bearings: 12-24 months
-""",
-            "belt": """
-- V-belts: 12-24 months
-- Serpentine belts: 18-36 months
-- Timing belts: 24-48 months
-- Drive belts: 12-24 months
-- Heavy-duty belts: 18-30 months
-""",
-            "sensor": """
-- Temperature sensors: 24-48 months
-- Pressure sensors: 24-36 months
-- Proximity sensors: 36-60 months
-- Level sensors: 18-36 months
-- Flow sensors: 24-48 months
-""",
-            "motor": """
-- Electric motors: 60-120 months
-- Hydraulic pumps: 36-72 months
-- Gear pumps: 24-48 months
-- Servo motors: 48-84 months
-- Stepper motors: 36-60 months
-""",
-            "seal": """
-- O-rings: 12-24 months
-- Oil seals: 18-36 months
-- Hydraulic seals: 12-24 months
-- Gaskets: 12-36 months
-- Shaft seals: 18-30 months
-""",
-            "electrical": """
-- Switches: 24-48 months
-- Relays: 24-60 months
-- Contactors: 36-72 months
-- Fuses: Check annually, replace as needed
-- Circuit breakers: 60-120 months
-""",
-            "hydraulic": """
-- Hydraulic cylinders: 36-72 months
-- Hydraulic valves: 24-48 months
-- Hydraulic hoses: 12-24 months
-- Hydraulic fittings: 24-60 months
-- Accumulators: 36-72 months
-""",
-            "general": """
-- Mechanical components: 12-36 months
-- Wear parts: 6-18 months
-- Structural components: 36-120 months
-- Consumables: 3-12 months
-- Safety components: 12-24 months
-"""
-        }
-        
-        return examples.get(part_type, examples["general"])
+        return _categorize_lower(_normalize(part_name))
+
+    def categorize_parts(self, part_names: List[str]) -> List[str]:
+        """
+        Categorize many part names at once, in the same order as part_names
+        Names repeated across machines are only matched once.
+        """
+        categories = {}
+        for name in part_names:
+            if name not in categories:
+                categories[name] = self._categorize_part(name)
+        return [categories[name] for name in part_names]
     
     def _get_fallback_lifespan(self, part_name: str) -> int:
         """Get fallback lifespan based on part type with enhanced detection"""
-        part_name_lower = part_name.lower()
-        
-        # Enhanced fallback rules with more specific detection
-        if any(word in part_name_lower for word in [
-            "air filter", "engine air", "cabin filter"
-        ]):
-            return 6  # Air filters - 6 months
-        elif any(word in part_name_lower for word in [
-            "oil filter", "hydraulic filter", "fuel filter"
-        ]):
-            return 6  # Fluid filters - 6 months
-        elif any(word in part_name_lower for word in [
-            "filter", "filtro", "element"
-        ]):
-            return 6  # Generic filters - 6 months
-        elif any(word in part_name_lower for word in [
-            "bearing", "cuscinetto", "ball bearing", "roller"
-        ]):
-            return 36  # Bearings - 36 months
-        elif any(word in part_name_lower for word in [
-            "belt", "cintura", "v-belt", "serpentine", "timing"
-        ]):
-            return 18  # Belts - 18 months
-        elif any(word in part_name_lower for word in [
-            "sensor", "sensore", "temperature", "pressure"
-        ]):
-            return 30  # Sensors - 30 months
-        elif any(word in part_name_lower for word in [
-            "motor", "motore", "pump", "pompa"
-        ]):
-            return 60  # Motors/pumps - 60 months
-        elif any(word in part_name_lower for word in [
-            "seal", "gasket", "guarnizione", "o-ring"
-        ]):
-            return 24  # Seals - 24 months
-        elif any(word in part_name_lower for word in [
-            "switch", "relay", "contactor", "electrical"
-        ]):
-            return 36  # Electrical - 36 months
-        elif any(word in part_name_lower for word in [
-            "hydraulic", "cylinder", "valve", "hose"
-        ]):
-            return 30  # Hydraulic - 30 months
-        else:
-            return 18  # Default - 18 months
+        return _fallback_lower(_normalize(part_name))
 
 # Test the AI lifespan lookup
 if __name__ == "__main__":
@@ -1,43 +1,107 @@
-from flask import Flask, jsonify
+import asyncio
+from contextlib import asynccontextmanager
+import logging
+import os
+from typing import Optional
+from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
+import uvicorn
 from structured_ai_agent import StructuredSparePartsAgent
 
-app = Flask(__name__)
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, so every worker warms up on its own
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
 agent = StructuredSparePartsAgent()
 
-@app.route('/api/replacement-predictions', methods=['GET'])
-def get_replacement_predictions():
-    predictions = agent.predict_part_replacements()
-    return jsonify(predictions)
-
-@app.route('/api/metrics', methods=['GET'])
-def get_metrics():
-    metrics = agent.get_dashboard_metrics()
-    return jsonify(metrics)
-
-@app.route('/api/alerts', methods=['GET'])
-def get_alerts():
-    alerts = agent.get_maintenance_alerts()
-    return jsonify(alerts)
-
-@app.route('/api/costs', methods=['GET'])
-def get_costs():
-    costs = agent.get_cost_analysis()
-    return jsonify(costs)
-
-@app.route('/api/predictions', methods=['GET'])
-def get_predictions():
-    predictions = agent.get_predictions()
-    return jsonify(predictions)
-
-@app.route('/api/due-checks', methods=['GET'])
-def get_due_checks():
-    due_checks = agent.get_due_part_checks()
-    return jsonify(due_checks)
-
-@app.route('/api/machine-analysis/<machine_id>', methods=['GET'])
-def get_machine_analysis(machine_id):
-    analysis = agent.get_machine_analysis(machine_id)
-    return jsonify(analysis)
+# Held by the worker warming the lifespan cache. The other workers wait for it and then warm up
+# from the SQLite cache it filled, so OpenAI is asked once rather than once per worker
+_WARMUP_LOCK_PATH = 'lifespan_warmup.lock'
+
+# This worker's warm-up, running on a thread; lifespan routes wait for it instead of repeating its lookups
+_warmup: Optional[asyncio.Future] = None
+
+def _warm_up_once() -> int:
+    """Fill this worker's lifespan cache, one worker at a time"""
+    if fcntl is None:
+        return agent.warm_lifespan_cache()
+    with open(_WARMUP_LOCK_PATH, 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        return agent.warm_lifespan_cache()
+
+def _log_warmup(future: asyncio.Future):
+    if future.cancelled():
+        return
+    error = future.exception()
+    if error:
+        logger.error("❌ Lifespan cache warm-up failed: %s", error)
+    else:
+        logger.info("🔥 Lifespan cache warm-up done: %s parts looked up", future.result())
+
+async def _wait_for_warmup():
+    """Reuse the startup lookups; if the warm-up failed, routes look up what's missing themselves"""
+    if _warmup is None:
+        return
+    try:
+        await asyncio.shield(_warmup)
+    except Exception:
+        pass  # already logged by _log_warmup
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Fill the AI lifespan cache on a worker thread at startup so prediction
+    # routes are served from cache instead of calling OpenAI per part
+    global _warmup
+    _warmup = asyncio.get_running_loop().run_in_executor(None, _warm_up_once)
+    _warmup.add_done_callback(_log_warmup)
+    yield
+
+app = FastAPI(lifespan=lifespan)
+
+# Agent methods block on OpenAI I/O, so they run in the threadpool
+# to keep the event loop free for other requests.
+
+@app.get('/api/replacement-predictions')
+async def get_replacement_predictions():
+    await _wait_for_warmup()
+    return await run_in_threadpool(agent.predict_part_replacements)
+
+@app.get('/api/metrics')
+async def get_metrics():
+    return await run_in_threadpool(agent.get_dashboard_metrics)
+
+@app.get('/api/alerts')
+async def get_alerts():
+    return await run_in_threadpool(agent.get_maintenance_alerts)
+
+@app.get('/api/costs')
+async def get_costs():
+    return await run_in_threadpool(agent.get_cost_analysis)
+
+@app.get('/api/dashboard')
+async def get_dashboard():
+    return await run_in_threadpool(agent.get_dashboard_overview)
+
+@app.get('/api/predictions')
+async def get_predictions():
+    return await run_in_threadpool(agent.get_predictions)
+
+@app.get('/api/due-checks')
+async def get_due_checks():
+    await _wait_for_warmup()
+    return await run_in_threadpool(agent.get_due_part_checks)
+
+@app.post('/api/reload')
+async def reload_data():
+    return {"reloaded": await run_in_threadpool(agent.reload_data)}
+
+@app.get('/api/machine-analysis/{machine_id}')
+async def get_machine_analysis(machine_id: str):
+    return await run_in_threadpool(agent.get_machine_analysis, machine_id)
 
 if __name__ == '__main__':
-    app.run(debug=True) 
\ No newline at end of file
+    # Flask's port, which the dashboard expects; API_PORT overrides it
+    uvicorn.run("api_server:app", port=int(os.getenv("API_PORT", "5000")), workers=4)
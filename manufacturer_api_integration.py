@@ -3,9 +3,14 @@
 Manufacturer API Integration for Accurate Part Lifespan Data
 """
 
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
 import requests
+from requests.adapters import HTTPAdapter
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential_jitter
 import json
 import os
+import re
 from typing import Dict, Optional, List
 from dotenv import load_dotenv
 import logging
@@ -13,33 +18,80 @@ import logging
 load_dotenv()
 logger = logging.getLogger(__name__)
 
+@dataclass(frozen=True, slots=True)
+class _APIKeys:
+    """API keys for manufacturer and technical database services"""
+    cat: Optional[str]  # Caterpillar API
+    cummins: Optional[str]  # Cummins API
+    volvo: Optional[str]  # Volvo API
+    komatsu: Optional[str]  # Komatsu API
+    partslink: Optional[str]  # PartsLink24
+    tecnet: Optional[str]  # TecNet
+
+# Read once at import instead of on every ManufacturerAPIIntegration construction
+_KEYS = _APIKeys(
+    cat=os.getenv("CAT_API_KEY"),
+    cummins=os.getenv("CUMMINS_API_KEY"),
+    volvo=os.getenv("VOLVO_API_KEY"),
+    komatsu=os.getenv("KOMATSU_API_KEY"),
+    partslink=os.getenv("PARTSLINK_API_KEY"),
+    tecnet=os.getenv("TECNET_API_KEY")
+)
+
+# Shared HTTP session so manufacturer lookups reuse pooled keep-alive connections
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=64))
+
+# (connect, read) seconds to wait for a manufacturer API response
+_REQUEST_TIMEOUT = (3, 10)
+
+class _RetryableStatus(Exception):
+    """Raised for rate-limited (429) or server error (5xx) API responses"""
+
+@retry(
+    stop=stop_after_attempt(3),
+    wait=wait_exponential_jitter(initial=0.5, max=5),
+    retry=retry_if_exception_type((requests.ConnectionError, requests.Timeout, _RetryableStatus)),
+    reraise=True
+)
+def _get(url: str, **kwargs) -> requests.Response:
+    """GET through the shared session, retrying transient failures with backoff"""
+    response = _SESSION.get(url, timeout=_REQUEST_TIMEOUT, **kwargs)
+    if response.status_code == 429 or response.status_code >= 500:
+        raise _RetryableStatus(f"{url} returned {response.status_code}")
+    return response
+
+# Worker threads used to query the lifespan sources concurrently
+_EXECUTOR = ThreadPoolExecutor(max_workers=16)
+
+def _result_or_none(future: Future) -> Optional[Dict]:
+    """Return a lookup future's result, treating failures as no data"""
+    try:
+        return future.result()
+    except Exception as e:
+        logger.error("Lifespan source error: %s", e)
+        return None
+
 class ManufacturerAPIIntegration:
     """
     Integration with manufacturer APIs for accurate part lifespan data
     """
     
     def __init__(self):
-        # API keys for different manufacturer services
-        self.cat_api_key = os.getenv("CAT_API_KEY")  # Caterpillar API
-        self.cummins_api_key = os.getenv("CUMMINS_API_KEY")  # Cummins API
-        self.volvo_api_key = os.getenv("VOLVO_API_KEY")  # Volvo API
-        self.komatsu_api_key = os.getenv("KOMATSU_API_KEY")  # Komatsu API
-        
-        # Technical database APIs
-        self.partslink_api_key = os.getenv("PARTSLINK_API_KEY")  # PartsLink24
-        self.tecnet_api_key = os.getenv("TECNET_API_KEY")  # TecNet
+        # API keys for manufacturer services and technical databases
+        self.keys = _KEYS
         
     def get_caterpillar_part_info(self, part_number: str) -> Optional[Dict]:
         """Get part information from Caterpillar API"""
-        if not self.cat_api_key:
+        if not self.keys.cat:
             return None
             
         try:
             # Caterpillar Parts API endpoint
             url = f"https://api.cat.com/parts/{part_number}"
-            headers = {"Authorization": f"Bearer {self.cat_api_key}"}
+            headers = {"Authorization": f"Bearer {self.keys.cat}"}
             
-            response = requests.get(url, headers=headers)
+            response = _get(url, headers=headers)
             if response.status_code == 200:
                 data = response.json()
                 return {
@@ -49,21 +101,21 @@ class ManufacturerAPIIntegration:
                     "source": "caterpillar_api"
                 }
         except Exception as e:
-            logger.error(f"Caterpillar API error: {e}")
+            logger.error("Caterpillar API error: %s", e)
         
         return None
     
     def get_cummins_part_info(self, part_number: str) -> Optional[Dict]:
         """Get part information from Cummins API"""
-        if not self.cummins_api_key:
+        if not self.keys.cummins:
             return None
             
         try:
             # Cummins Parts API endpoint
             url = f"https://api.cummins.com/parts/{part_number}"
-            headers = {"Authorization": f"Bearer {self.cummins_api_key}"}
+            headers = {"Authorization": f"Bearer {self.keys.cummins}"}
             
-            response = requests.get(url, headers=headers)
+            response = _get(url, headers=headers)
             if response.status_code == 200:
                 data = response.json()
                 return {
@@ -73,26 +125,26 @@ class ManufacturerAPIIntegration:
                     "source": "cummins_api"
                 }
         except Exception as e:
-            logger.error(f"Cummins API error: {e}")
+            logger.error("Cummins API error: %s", e)
         
         return None
     
     def get_partslink_info(self, part_name: str, machine_type: str) -> Optional[Dict]:
         """Get part information from PartsLink24 database"""
-        if not self.partslink_api_key:
+        if not self.keys.partslink:
             return None
             
         try:
             # PartsLink24 API endpoint
             url = "https://api.partslink24.com/search"
-            headers = {"Authorization": f"Bearer {self.partslink_api_key}"}
+            headers = {"Authorization": f"Bearer {self.keys.partslink}"}
             params = {
                 "part_name": part_name,
                 "machine_type": machine_type,
                 "include_lifespan": True
             }
             
-            response = requests.get(url, headers=headers, params=params)
+            response = _get(url, headers=headers, params=params)
             if response.status_code == 200:
                 data = response.json()
                 if data.get("results"):
@@ -104,26 +156,26 @@ class ManufacturerAPIIntegration:
                         "source": "partslink24"
                     }
         except Exception as e:
-            logger.error(f"PartsLink24 API error: {e}")
+            logger.error("PartsLink24 API error: %s", e)
         
         return None
     
     def get_tecnet_info(self, part_name: str, equipment_type: str) -> Optional[Dict]:
         """Get part information from TecNet database"""
-        if not self.tecnet_api_key:
+        if not self.keys.tecnet:
             return None
             
         try:
             # TecNet API endpoint
             url = "https://api.tecnet.com/parts/search"
-            headers = {"Authorization": f"Bearer {self.tecnet_api_key}"}
+            headers = {"Authorization": f"Bearer {self.keys.tecnet}"}
             params = {
                 "query": part_name,
                 "equipment_type": equipment_type,
                 "include_maintenance_data": True
             }
             
-            response = requests.get(url, headers=headers, params=params)
+            response = _get(url, headers=headers, params=params)
             if response.status_code == 200:
                 data = response.json()
                 if data.get("parts"):
@@ -135,91 +187,99 @@ class ManufacturerAPIIntegration:
                         "source": "tecnet"
                     }
         except Exception as e:
-            logger.error(f"TecNet API error: {e}")
+            logger.error("TecNet API error: %s", e)
         
         return None
 
+# Industry maintenance standards by category
+_MAINTENANCE_STANDARDS = {
+    "air_filters": {
+        "typical_lifespan_months": 6,
+        "range_months": (3, 12),
+        "factors": ["operating_conditions", "dust_levels", "humidity"]
+    },
+    "oil_filters": {
+        "typical_lifespan_months": 6,
+        "range_months": (3, 12),
+        "factors": ["oil_quality", "operating_hours", "contamination"]
+    },
+    "fuel_filters": {
+        "typical_lifespan_months": 12,
+        "range_months": (6, 24),
+        "factors": ["fuel_quality", "operating_conditions"]
+    },
+    "belts": {
+        "typical_lifespan_months": 18,
+        "range_months": (12, 36),
+        "factors": ["tension", "alignment", "operating_conditions"]
+    },
+    "bearings": {
+        "typical_lifespan_months": 36,
+        "range_months": (24, 60),
+        "factors": ["load", "speed", "lubrication", "contamination"]
+    },
+    "seals": {
+        "typical_lifespan_months": 24,
+        "range_months": (12, 36),
+        "factors": ["pressure", "temperature", "chemical_exposure"]
+    },
+    "sensors": {
+        "typical_lifespan_months": 36,
+        "range_months": (24, 48),
+        "factors": ["environment", "accuracy_requirements"]
+    },
+    "motors": {
+        "typical_lifespan_months": 60,
+        "range_months": (36, 84),
+        "factors": ["load", "operating_hours", "maintenance"]
+    }
+}
+
+# Part name keyword -> maintenance standard category
+_PART_CATEGORIES = {
+    "filtro aria": "air_filters",
+    "air filter": "air_filters",
+    "oil filter": "oil_filters",
+    "fuel filter": "fuel_filters",
+    "belt": "belts",
+    "bearing": "bearings",
+    "seal": "seals",
+    "gasket": "seals",
+    "sensor": "sensors",
+    "motor": "motors",
+    "pump": "motors",
+    "compressor": "motors"
+}
+
+# Single-pass keyword matcher; the lookahead reports overlapping hits so
+# the category listed first in _PART_CATEGORIES still wins
+_KEYWORD_PRIORITY = {keyword: i for i, keyword in enumerate(_PART_CATEGORIES)}
+_KEYWORD_PATTERN = re.compile(
+    "(?=(" + "|".join(re.escape(keyword) for keyword in _PART_CATEGORIES) + "))"
+)
+
 class TechnicalDatabaseIntegration:
     """
     Integration with technical databases and maintenance standards
     """
     
     def __init__(self):
-        # Load technical standards data
-        self.maintenance_standards = self._load_maintenance_standards()
-        self.part_categories = self._load_part_categories()
-    
-    def _load_maintenance_standards(self) -> Dict:
-        """Load industry maintenance standards"""
-        return {
-            "air_filters": {
-                "typical_lifespan_months": 6,
-                "range_months": (3, 12),
-                "factors": ["operating_conditions", "dust_levels", "humidity"]
-            },
-            "oil_filters": {
-                "typical_lifespan_months": 6,
-                "range_months": (3, 12),
-                "factors": ["oil_quality", "operating_hours", "contamination"]
-            },
-            "fuel_filters": {
-                "typical_lifespan_months": 12,
-                "range_months": (6, 24),
-                "factors": ["fuel_quality", "operating_conditions"]
-            },
-            "belts": {
-                "typical_lifespan_months": 18,
-                "range_months": (12, 36),
-                "factors": ["tension", "alignment", "operating_conditions"]
-            },
-            "bearings": {
-                "typical_lifespan_months": 36,
-                "range_months": (24, 60),
-                "factors": ["load", "speed", "lubrication", "contamination"]
-            },
-            "seals": {
-                "typical_lifespan_months": 24,
-                "range_months": (12, 36),
-                "factors": ["pressure", "temperature", "chemical_exposure"]
-            },
-            "sensors": {
-                "typical_lifespan_months": 36,
-                "range_months": (24, 48),
-                "factors": ["environment", "accuracy_requirements"]
-            },
-            "motors": {
-                "typical_lifespan_months": 60,
-                "range_months": (36, 84),
-                "factors": ["load", "operating_hours", "maintenance"]
-            }
-        }
-    
-    def _load_part_categories(self) -> Dict:
-        """Load part categorization data"""
-        return {
-            "filtro aria": "air_filters",
-            "air filter": "air_filters",
-            "oil filter": "oil_filters",
-            "fuel filter": "fuel_filters",
-            "belt": "belts",
-            "bearing": "bearings",
-            "seal": "seals",
-            "gasket": "seals",
-            "sensor": "sensors",
-            "motor": "motors",
-            "pump": "motors",
-            "compressor": "motors"
-        }
+        # Technical standards data (static, shared by all instances)
+        self.maintenance_standards = _MAINTENANCE_STANDARDS
+        self.part_categories = _PART_CATEGORIES
+        self._keyword_priority = _KEYWORD_PRIORITY
+        self._keyword_pattern = _KEYWORD_PATTERN
     
     def categorize_part(self, part_name: str) -> str:
         """Categorize part based on name"""
         part_name_lower = part_name.lower()
         
-        for keyword, category in self.part_categories.items():
-            if keyword in part_name_lower:
-                return category
+        matches = [match.group(1) for match in self._keyword_pattern.finditer(part_name_lower)]
+        if not matches:
+            return "unknown"
         
-        return "unknown"
+        keyword = min(matches, key=self._keyword_priority.__getitem__)
+        return self.part_categories[keyword]
     
     def get_standard_lifespan(self, part_name: str, operating_conditions: Dict = None) -> Optional[int]:
         """Get standard lifespan based on part category and conditions"""
@@ -278,29 +338,40 @@ class HybridLifespanLookup:
         manufacturer = part_info.get("manufacturer", "")
         operating_conditions = part_info.get("operating_conditions", {})
         
-        logger.info(f"🔍 Looking up lifespan for: {part_name}")
+        logger.info("🔍 Looking up lifespan for: %s", part_name)
         
-        # Priority 1: Manufacturer API (most accurate)
+        # Query all applicable sources at once; results are still used in priority order
+        manufacturer_future = None
+        db_futures = []
         if part_number and manufacturer:
-            manufacturer_result = self._try_manufacturer_api(part_number, manufacturer)
+            manufacturer_future = _EXECUTOR.submit(self._try_manufacturer_api, part_number, manufacturer)
+        if part_name and machine_type:
+            db_futures = [
+                _EXECUTOR.submit(self.manufacturer_api.get_partslink_info, part_name, machine_type),
+                _EXECUTOR.submit(self.manufacturer_api.get_tecnet_info, part_name, machine_type)
+            ]
+        
+        # Priority 1: Manufacturer API (most accurate)
+        if manufacturer_future:
+            manufacturer_result = _result_or_none(manufacturer_future)
             if manufacturer_result:
-                logger.info(f"✅ Found manufacturer data: {manufacturer_result['lifespan_months']} months")
+                logger.info("✅ Found manufacturer data: %s months", manufacturer_result['lifespan_months'])
                 return manufacturer_result['lifespan_months']
         
         # Priority 2: Technical database
-        if part_name and machine_type:
-            db_result = self._try_technical_database(part_name, machine_type)
+        if db_futures:
+            db_result = self._try_technical_database(db_futures)
             if db_result:
-                logger.info(f"✅ Found database data: {db_result['lifespan_months']} months")
+                logger.info("✅ Found database data: %s months", db_result['lifespan_months'])
                 return db_result['lifespan_months']
         
         # Priority 3: Industry standards
         standard_result = self.technical_db.get_standard_lifespan(part_name, operating_conditions)
         if standard_result:
-            logger.info(f"✅ Found standard data: {standard_result} months")
+            logger.info("✅ Found standard data: %s months", standard_result)
             return standard_result
         
-        logger.warning(f"❌ No lifespan data found for {part_name}")
+        logger.warning("❌ No lifespan data found for %s", part_name)
         return None
     
     def _try_manufacturer_api(self, part_number: str, manufacturer: str) -> Optional[Dict]:
@@ -314,17 +385,12 @@ class HybridLifespanLookup:
         
         return None
     
-    def _try_technical_database(self, part_name: str, machine_type: str) -> Optional[Dict]:
-        """Try technical databases"""
-        # Try PartsLink24
-        result = self.manufacturer_api.get_partslink_info(part_name, machine_type)
-        if result:
-            return result
-        
-        # Try TecNet
-        result = self.manufacturer_api.get_tecnet_info(part_name, machine_type)
-        if result:
-            return result
+    def _try_technical_database(self, db_futures: List[Future]) -> Optional[Dict]:
+        """Try technical databases (PartsLink24, then TecNet) from in-flight lookups"""
+        for future in db_futures:
+            result = _result_or_none(future)
+            if result:
+                return result
         
         return None
 
@@ -1,14 +1,30 @@
-import json
+import asyncio
+import hashlib
+import httpx
+import itertools
 import openai
+from openai import AsyncOpenAI
+import orjson
 import os
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from functools import cached_property
+from typing import AsyncIterator, Callable, Dict, List, Optional, Sequence
 import logging
 from dotenv import load_dotenv
-import requests
 import re
-from serpapi import GoogleSearch
-from enhanced_lifespan_lookup import EnhancedLifespanLookup
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential_jitter
+from records import compact_json, first_by
+from semantic_cache import EMBEDDING_MODEL, embed_texts_async, normalize, shared_cache
+from openai_clients import new_async_openai_client, new_http_client, new_openai_client
+
+try:
+    from simple_lifespan_solution import SimpleLifespanLookup
+except ImportError:
+    SimpleLifespanLookup = None
 
 load_dotenv()
 
@@ -16,33 +32,246 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Callback receiving answer text as it streams in, bound per call by the CLI's worker thread;
+# ask_ai streams its answer when one is set
+_on_token: ContextVar[Optional[Callable[[str], None]]] = ContextVar("on_token", default=None)
+
+class BatchFailedError(RuntimeError):
+    """A Batch API job ended without results (failed, expired or cancelled)"""
+
+# Default chat settings shared by ask_ai and ask_ai_async; agents may override the model
+_SYSTEM_MESSAGE = "You are an expert maintenance AI analyst with deep knowledge of spare parts management, equipment health monitoring, and predictive maintenance. Provide detailed, actionable insights based on the data provided."
+_CHAT_PARAMS = {
+    "model": "gpt-4o-mini",
+    "temperature": 0.0,
+    # Route every request sharing the system + data prefix to the same cache on OpenAI's side
+    "prompt_cache_key": "spare_parts_v1"
+}
+# Seconds before an OpenAI request (sync or async) is abandoned
+_OPENAI_TIMEOUT = 30.0
+
+# SerpAPI search endpoint, called directly so lookups share one pooled connection
+_SERPAPI_URL = "https://serpapi.com/search"
+_SERPAPI_TIMEOUT = 10.0
+
+# Batch API statuses after which a batch will never produce results
+_BATCH_FAILED_STATUSES = frozenset({"failed", "expired", "cancelled"})
+
+# Default lifespans in months for common parts, by part ID
+_FALLBACK_LIFESPANS = {
+    3: 12,   # Air filter - 1 year
+    4: 24,   # Oil filter - 2 years
+    9: 6,    # Fuel filter - 6 months
+    5: 18,   # Belt - 1.5 years
+    6: 12,   # Bearing - 1 year
+    7: 24,   # Seal - 2 years
+    8: 18,   # Sensor - 1.5 years
+    10: 12,  # Motor - 1 year
+    11: 6,   # Battery - 6 months
+    12: 24,  # Screen - 2 years
+    13: 18,  # Component - 1.5 years
+    14: 12,  # Part - 1 year
+    15: 24,  # Assembly - 2 years
+    16: 18,  # Module - 1.5 years
+    17: 12,  # Unit - 1 year
+}
+
+# Most part lifespans remembered per session
+_LIFESPAN_CACHE_SIZE = 4096
+
+# Completion budgets: detailed analyses vs. system-wide summaries
+_MAX_TOKENS = 1000
+_SUMMARY_MAX_TOKENS = 600
+
+# OpenAI only caches prompt prefixes of at least this many tokens
+_MIN_CACHED_PREFIX_TOKENS = 1024
+
+# Fields kept when records are dumped into prompts; the rest are IDs,
+# audit columns and mostly-null CRM fields that only cost tokens
+_PROMPT_FIELDS = {
+    'equipment': ['ID', 'InternalIdentification', 'ManufactIdentification', 'ProductId', 'ManufacturerId',
+                  'MachineAddress', 'CentralCost', 'WarrProduct', 'WarrantyType', 'WarrBuyDate', 'InternalTestDate'],
+    'spare_parts': ['ID', 'ROLLINGSTOCKID', 'MACHINEID', 'SPAREPARTID', 'CODE', 'NOTE',
+                    'QUANTITY', 'UNITPRICE', 'UNITCOST', 'REPLACEDATE'],
+    'activities': ['ID', 'ROLLSTOCKCROSSID', 'MACHINEID', 'TYPE', 'SUBJECT', 'DESCRIPTION', 'ACTIVITYDATE',
+                   'ACTIVITYENDDATE', 'CLOSEDATE', 'STATE', 'PRIORITY', 'TECHNICAL', 'DURATION', 'CONTRACTID'],
+    'movements': ['ID', 'ROLLSTOCKID', 'ROLLSTOCKSERIAL', 'DATEMOVEMENT', 'ADDRESSFROM', 'ADDRESSTO', 'NOTE', 'TYPE']
+}
+
+# Queries for the system-wide analyses
+_INSIGHTS_QUERY = "Provide a comprehensive analysis of the maintenance system including equipment health, cost analysis, efficiency metrics, risk assessment, and actionable recommendations."
+_ALERTS_QUERY = "Generate comprehensive maintenance alerts based on the data. Identify urgent issues, upcoming scheduled maintenance, high-cost parts that need attention, equipment health concerns, and any patterns that suggest preventive actions are needed."
+_COSTS_QUERY = "Analyze the maintenance costs, identify cost trends, expensive parts, cost optimization opportunities, and provide recommendations for cost management."
+_SYSTEM_SCHEDULE_QUERY = "Analyze the overall maintenance scheduling patterns, identify optimal maintenance intervals for different equipment types, and provide a comprehensive maintenance scheduling strategy."
+
+# Marks the start of each answer in a batched response, e.g. "### 2"
+_BATCH_ANSWER_RE = re.compile(r'^###\s*(\d+)\s*$', re.MULTILINE)
+
+# Lifespan lookups must answer by calling report_lifespan; the strict schema makes the
+# arguments always {"months": <int or null>}, which fits in a few tokens
+_LIFESPAN_TOOL = {
+    "type": "function",
+    "function": {
+        "name": "report_lifespan",
+        "description": "Report the part's lifespan in months, or null if it cannot be determined",
+        "strict": True,
+        "parameters": {
+            "type": "object",
+            "properties": {"months": {"type": ["integer", "null"]}},
+            "required": ["months"],
+            "additionalProperties": False
+        }
+    }
+}
+_LIFESPAN_PARAMS = {
+    "tools": [_LIFESPAN_TOOL],
+    "tool_choice": {"type": "function", "function": {"name": "report_lifespan"}},
+    "temperature": 0.1,
+    "max_tokens": 20
+}
+
+def _reported_months(message) -> Optional[int]:
+    """Months from a report_lifespan tool call, or None if unknown or missing"""
+    if not message.tool_calls:
+        return None
+    try:
+        months = orjson.loads(message.tool_calls[0].function.arguments).get("months")
+    except (orjson.JSONDecodeError, AttributeError):
+        return None
+    return months if isinstance(months, int) and months > 0 else None
+
+# Lifespans stated in search snippets, e.g. "replace every 12 months", "lasts 2 years" or "a 5-year
+# service life". A duration only counts next to a lifespan word in the same clause, so "founded
+# 20 years ago" or "3 year warranty" are ignored
+_LIFESPAN_WORDS = r'(?:replac\w*|chang\w*|interval|every|service\s+life|useful\s+life|life\s*-?\s*span|lifetime|life\s+expectancy|last(?:s|ing)?)'
+_DURATION = r'(\d{1,3})\s*-?\s*(months?|years?|yrs?)\b'
+_SNIPPET_LIFESPAN_RE = re.compile(
+    rf'\b{_LIFESPAN_WORDS}\b[^.;!?\n\d]{{0,40}}?\b{_DURATION}|\b{_DURATION}[^.;!?\n\d]{{0,25}}?\b{_LIFESPAN_WORDS}\b',
+    re.IGNORECASE
+)
+
+def _lifespan_from_snippets(search_results: List[Dict]) -> Optional[int]:
+    """
+    Lifespan in months that search snippets agree on, or None if they don't clearly agree
+    The most common stated value must appear in at least two snippets and in most of the mentions.
+    """
+    mentions = []
+    for result in search_results:
+        months = {
+            int(match[1] or match[3]) * (1 if (match[2] or match[4]).lower().startswith('m') else 12)
+            for match in _SNIPPET_LIFESPAN_RE.finditer(result.get("snippet", ""))
+        }
+        mentions.extend(m for m in months if m > 0)
+    
+    if not mentions:
+        return None
+    lifespan, count = Counter(mentions).most_common(1)[0]
+    if count >= 2 and count * 2 > len(mentions):
+        return lifespan
+    return None
+
+def _project(records: List[Dict], kind: str) -> List[Dict]:
+    """Keep only the prompt fields of each record"""
+    fields = _PROMPT_FIELDS[kind]
+    return [{field: record[field] for field in fields if field in record} for record in records]
+
+class _Throttle:
+    """Token buckets keeping concurrent requests under requests- and tokens-per-minute limits"""
+    
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.request_budget = float(requests_per_minute)
+        self.token_budget = float(tokens_per_minute)
+        self.updated = time.monotonic()
+    
+    def reserve(self, tokens: int) -> float:
+        """Take one request and its estimated tokens; returns the seconds to wait before sending"""
+        now = time.monotonic()
+        elapsed_minutes = (now - self.updated) / 60.0
+        self.updated = now
+        self.request_budget = min(self.requests_per_minute, self.request_budget + elapsed_minutes * self.requests_per_minute) - 1
+        self.token_budget = min(self.tokens_per_minute, self.token_budget + elapsed_minutes * self.tokens_per_minute) - tokens
+        return max(
+            0.0,
+            -self.request_budget / self.requests_per_minute * 60.0,
+            -self.token_budget / self.tokens_per_minute * 60.0
+        )
+
+# Retry transient OpenAI failures (429s, dropped connections and timeouts, 5xx) with jittered backoff
+_openai_retry = retry(
+    stop=stop_after_attempt(5),
+    wait=wait_exponential_jitter(initial=1, max=30),
+    retry=retry_if_exception_type((
+        openai.RateLimitError,
+        openai.APIConnectionError,
+        openai.InternalServerError
+    )),
+    reraise=True
+)
+
+def _group_by(items: List[Dict], key: str) -> Dict:
+    """Index records by a field, keeping every record per value"""
+    groups = {}
+    for item in items:
+        groups.setdefault(item.get(key), []).append(item)
+    return groups
+
 class OpenAI_SparePartsAgent:
     """
     AI Agent that uses OpenAI to analyze spare parts data and provide intelligent insights
     """
     
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None, model: str = None):
         default_key = os.getenv("OPENAI_API_KEY", "")
         self.api_key = default_key
         if self.api_key:
-            openai.api_key = self.api_key
+            # One client for the agent's lifetime, so calls reuse pooled keep-alive connections
+            self.client = new_openai_client(self.api_key, timeout=_OPENAI_TIMEOUT, max_retries=3)
             self.use_openai = True
         else:
             self.use_openai = False
             logger.warning("No OpenAI API key found. Using fallback responses.")
         
-        # Load data
-        self.data = self._load_all_data()
+        # Chat settings, with the model overridable per agent (e.g. a cheaper one for smoke tests)
+        self._chat_params = {**_CHAT_PARAMS, "model": model or _CHAT_PARAMS["model"]}
+        
+        # Answers to earlier queries, reused for near-identical queries; saved on exit
+        self._semantic_cache = shared_cache()
+        
+        # Rate limits for concurrent (async) requests
+        self._throttle = _Throttle(
+            int(os.getenv("OPENAI_REQUESTS_PER_MINUTE", "3500")),
+            int(os.getenv("OPENAI_TOKENS_PER_MINUTE", "90000"))
+        )
+        
+        # LRU cache of found lifespans keyed by (part_name, machine_name, manufacturer)
+        self._lifespan_cache = OrderedDict()
+        self._lifespan_lock = threading.Lock()
         logger.info("🤖 OpenAI AI Agent initialized successfully")
     
+    @cached_property
+    def _search_http(self) -> httpx.Client:
+        """HTTP client for SerpAPI, created on the first web lookup and kept for keep-alive reuse"""
+        return new_http_client(timeout=_SERPAPI_TIMEOUT)
+    
+    @cached_property
+    def data(self) -> Dict:
+        """All records, loaded on first use so commands that never need them skip the parse"""
+        return self._load_all_data()
+    
     def _load_all_data(self) -> Dict:
         """Load all data from db.json"""
         data = {}
         
         try:
             # Load all data from updated_db.json
-            with open('json/updated_db.json', 'r') as f:
-                db_data = json.load(f)
+            with open('json/updated_db.json', 'rb') as f:
+                raw = f.read()
+            db_data = orjson.loads(raw)
+            
+            # Fingerprint of the data, so cached answers are not reused after it changes
+            self._data_hash = hashlib.sha256(raw).hexdigest()
             
             # Map db.json structure to expected format
             data['equipment'] = db_data.get('rollingstock', [])
@@ -56,17 +285,74 @@ class OpenAI_SparePartsAgent:
             data['maintenance_schedules'] = db_data.get('maintenanceSchedules', [])
             data['machine_producers'] = db_data.get('machineProducers', [])
             
-            logger.info(f"✅ Loaded data from db.json: {len(data['machines'])} machines, {len(data['equipment'])} equipment, {len(data['spare_parts'])} parts, {len(data['activities'])} activities")
+            logger.info("✅ Loaded data from db.json: %s machines, %s equipment, %s parts, %s activities", len(data['machines']), len(data['equipment']), len(data['spare_parts']), len(data['activities']))
             
-        except Exception as e:
-            logger.error(f"❌ Error loading data from db.json: {e}")
+        except (OSError, orjson.JSONDecodeError) as e:
+            logger.error("❌ Error loading data from db.json: %s", e)
             raise
         
         return data
     
-    def _create_ai_prompt(self, query: str, context: str = "") -> str:
-        """Create a comprehensive prompt for OpenAI"""
-        
+    # Indexes by the IDs used for lookups, so per-equipment queries avoid full scans.
+    # Like the data itself, each is built on first use.
+    
+    @cached_property
+    def _machines_by_id(self) -> Dict:
+        return first_by(self.data['machines'], 'id')
+    
+    @cached_property
+    def _machines_by_rollingstock(self) -> Dict:
+        return first_by(self.data['machines'], 'rollingstockId')
+    
+    @cached_property
+    def _equipment_by_id(self) -> Dict:
+        return first_by(self.data['equipment'], 'ID')
+    
+    @cached_property
+    def _parts_by_id(self) -> Dict:
+        return first_by(self.data['spare_parts'], 'SPAREPARTID')
+    
+    @cached_property
+    def _parts_by_rollingstock(self) -> Dict:
+        return _group_by(self.data['spare_parts'], 'ROLLINGSTOCKID')
+    
+    @cached_property
+    def _parts_by_key(self) -> Dict:
+        parts_by_key = {}
+        for part in self.data['spare_parts']:
+            parts_by_key.setdefault((part.get('ROLLINGSTOCKID'), part.get('SPAREPARTID')), []).append(part)
+        return parts_by_key
+    
+    @cached_property
+    def _activities_by_rollstockcross(self) -> Dict:
+        return _group_by(self.data['activities'], 'ROLLSTOCKCROSSID')
+    
+    @cached_property
+    def _activities_by_rollingstock(self) -> Dict:
+        return _group_by(self.data['activities'], 'ROLLINGSTOCKID')
+    
+    @cached_property
+    def _schedules_by_rollingstock(self) -> Dict:
+        return _group_by(self.data['maintenance_schedules'], 'rollingstockId')
+    
+    @cached_property
+    def _movements_by_rollstock(self) -> Dict:
+        return _group_by(self.data['movements'], 'ROLLSTOCKID')
+    
+    @cached_property
+    def _stats(self) -> Dict:
+        """Cost and alert statistics used in prompts, computed once since the data is fixed after load"""
+        return {
+            'total_cost': sum(part.get('UNITPRICE', 0) * part.get('QUANTITY', 1) for part in self.data['spare_parts']),
+            # Alert stats over the most recent 50 activities and parts
+            'urgent_activities': sum(1 for a in self.data['activities'][:50] if a.get('PRIORITY', 0) >= 2),
+            'high_cost_parts': sum(1 for p in self.data['spare_parts'][:50] if p.get('UNITPRICE', 0) > 200),
+            'upcoming_schedules': sum(1 for s in self.data['maintenance_schedules'] if s.get('nextMaintenanceDate'))
+        }
+    
+    @cached_property
+    def _data_overview(self) -> str:
+        """Record counts and total cost, the data context for prompts sent without samples"""
         # Prepare data summary with all available data types
         machines_count = len(self.data['machines'])
         equipment_count = len(self.data['equipment'])
@@ -78,18 +364,10 @@ class OpenAI_SparePartsAgent:
         maintenance_schedules_count = len(self.data['maintenance_schedules'])
         producers_count = len(self.data['machine_producers'])
         
-        # Calculate some basic stats for context
-        total_cost = sum(part.get('UNITPRICE', 0) * part.get('QUANTITY', 1) for part in self.data['spare_parts'])
+        # Basic stats for context
+        total_cost = self._stats['total_cost']
         
-        # Sample some data for analysis (limit to avoid token limits)
-        sample_machines = self.data['machines'][:3]  # First 3 machines
-        sample_equipment = self.data['equipment'][:2]  # First 2 equipment
-        sample_parts = self.data['spare_parts'][:3]   # First 3 parts
-        sample_activities = self.data['activities'][:3]  # First 3 activities
-        sample_schedules = self.data['maintenance_schedules'][:2]  # First 2 schedules
-        sample_producers = self.data['machine_producers'][:2]  # First 2 producers
-        
-        prompt = f"""
+        return f"""
 You are an expert AI maintenance analyst specializing in spare parts management, equipment health, and predictive maintenance.
 
 COMPREHENSIVE DATA CONTEXT:
@@ -104,26 +382,43 @@ COMPREHENSIVE DATA CONTEXT:
 - Machine Producers: {producers_count} (manufacturer information)
 - Total Maintenance Cost: ${total_cost:,.2f}
 
-SAMPLE DATA:
+"""
+    
+    @cached_property
+    def _data_summary(self) -> str:
+        """Data context and sample block shared by every analysis prompt"""
+        # Sample some data for analysis (limit to avoid token limits)
+        sample_machines = self.data['machines'][:3]  # First 3 machines
+        sample_equipment = _project(self.data['equipment'][:2], 'equipment')  # First 2 equipment
+        sample_parts = _project(self.data['spare_parts'][:3], 'spare_parts')   # First 3 parts
+        sample_activities = _project(self.data['activities'][:3], 'activities')  # First 3 activities
+        sample_schedules = self.data['maintenance_schedules'][:2]  # First 2 schedules
+        sample_producers = self.data['machine_producers'][:2]  # First 2 producers
+        
+        return f"""{self._data_overview}SAMPLE DATA:
 Machines (equipment inventory):
-{json.dumps(sample_machines, indent=2)}
+{compact_json(sample_machines)}
 
 Equipment/Rolling Stock (detailed specs):
-{json.dumps(sample_equipment, indent=2)}
+{compact_json(sample_equipment)}
 
 Spare Parts (maintenance parts):
-{json.dumps(sample_parts, indent=2)}
+{compact_json(sample_parts)}
 
 Maintenance Activities (service records):
-{json.dumps(sample_activities, indent=2)}
+{compact_json(sample_activities)}
 
 Maintenance Schedules (scheduled work):
-{json.dumps(sample_schedules, indent=2)}
+{compact_json(sample_schedules)}
 
 Machine Producers (manufacturers):
-{json.dumps(sample_producers, indent=2)}
+{compact_json(sample_producers)}
 
-USER QUERY: {query}
+"""
+    
+    def _create_ai_prompt(self, query: str, context: str = "") -> str:
+        """Create the per-request part of the prompt, sent after the shared data summary"""
+        return f"""USER QUERY: {query}
 
 {context}
 
@@ -137,88 +432,306 @@ Please provide a comprehensive, intelligent analysis based on this comprehensive
 
 Respond in a clear, professional manner suitable for a maintenance manager.
 """
-        return prompt
     
-    def ask_ai(self, query: str, context: str = "") -> str:
-        """Ask OpenAI for analysis"""
+    def ask_ai(self, query: str, context: str = "", max_tokens: int = _MAX_TOKENS, include_samples: bool = True) -> str:
+        """
+        Ask OpenAI for analysis
+        With include_samples=False the prompt carries only record counts, not the sample records.
+        """
         if not self.use_openai:
             return self._fallback_response(query)
         
+        # Bind the streaming callback now, before any cache or embedding round-trip
+        on_token = _on_token.get()
         try:
-            prompt = self._create_ai_prompt(query, context)
-            
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are an expert maintenance AI analyst with deep knowledge of spare parts management, equipment health monitoring, and predictive maintenance. Provide detailed, actionable insights based on the data provided."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.0,
-                max_tokens=1000
-            )
+            messages = self._create_messages(query, context, include_samples)
+            
+            # Reuse the answer to an identical, then a near-identical, query over the same context and data
+            prompt_hash = self._prompt_hash(context, include_samples)
+            cached = self._semantic_cache.get_exact(query, prompt_hash)
+            if cached is not None:
+                logger.info("⚡ Exact cache hit")
+                return cached
+            
+            embedding = self._embed(query)
+            if embedding:
+                cached = self._semantic_cache.lookup(embedding, prompt_hash)
+                if cached is not None:
+                    logger.info("⚡ Semantic cache hit")
+                    self._semantic_cache.add_exact(query, cached, prompt_hash)
+                    return cached
+            
+            if on_token:
+                answer = self._stream_answer(messages, on_token, max_tokens)
+            else:
+                response = self.client.chat.completions.create(messages=messages, max_tokens=max_tokens, **self._chat_params)
+                answer = response.choices[0].message.content
             
-            return response.choices[0].message.content
+            self._semantic_cache.add_exact(query, answer, prompt_hash)
+            if embedding:
+                self._semantic_cache.add(embedding, answer, prompt_hash)
+            return answer
             
         except Exception as e:
-            logger.error(f"OpenAI API error: {e}")
+            logger.error("OpenAI API error: %s", e)
             return self._fallback_response(query)
     
+    def _stream_answer(self, messages: List[Dict], on_token: Callable[[str], None], max_tokens: int = _MAX_TOKENS) -> str:
+        """Stream a completion, passing each piece of text to on_token as it arrives"""
+        stream = self.client.chat.completions.create(
+            messages=messages,
+            stream=True,
+            stream_options={"include_usage": True},
+            max_tokens=max_tokens,
+            **self._chat_params
+        )
+        
+        pieces = []
+        for chunk in stream:
+            if chunk.usage:
+                details = chunk.usage.prompt_tokens_details
+                cached_tokens = (details and details.cached_tokens) or 0
+                logger.info("📊 Tokens used: %s (%s prompt tokens from cache)", chunk.usage.total_tokens, cached_tokens)
+            if not chunk.choices:
+                continue
+            text = chunk.choices[0].delta.content
+            if text:
+                pieces.append(text)
+                on_token(text)
+        
+        return "".join(pieces)
+    
+    async def ask_ai_async(self, query: str, context: str = "", client: Optional[AsyncOpenAI] = None,
+                           max_tokens: int = _MAX_TOKENS, embedding: Optional[List[float]] = None,
+                           include_samples: bool = True) -> str:
+        """
+        Async variant of ask_ai, so many analyses can run concurrently
+        Pass an AsyncOpenAI client to share one connection pool across requests,
+        and a precomputed query embedding to skip the per-query embeddings call.
+        """
+        if not self.use_openai:
+            return self._fallback_response(query)
+        
+        if client is None:
+            async with self.new_async_client() as client:
+                return await self.ask_ai_async(query, context, client, max_tokens, embedding, include_samples)
+        
+        try:
+            messages = self._create_messages(query, context, include_samples)
+            
+            prompt_hash = self._prompt_hash(context, include_samples)
+            cached = self._semantic_cache.get_exact(query, prompt_hash)
+            if cached is not None:
+                logger.info("⚡ Exact cache hit")
+                return cached
+            
+            if embedding is None:
+                embedding = await self._embed_async(client, query)
+            if embedding:
+                cached = self._semantic_cache.lookup(embedding, prompt_hash)
+                if cached is not None:
+                    logger.info("⚡ Semantic cache hit")
+                    self._semantic_cache.add_exact(query, cached, prompt_hash)
+                    return cached
+            
+            answer = await self._complete_async(client, messages, max_tokens)
+            self._semantic_cache.add_exact(query, answer, prompt_hash)
+            if embedding:
+                self._semantic_cache.add(embedding, answer, prompt_hash)
+            return answer
+            
+        except Exception as e:
+            logger.error("OpenAI API error: %s", e)
+            return self._fallback_response(query)
+    
+    def new_async_client(self) -> AsyncOpenAI:
+        """AsyncOpenAI client with the agent's timeout, for the calling event loop"""
+        # Retries are handled by _openai_retry, so the client's own retries are disabled
+        return new_async_openai_client(self.api_key, timeout=_OPENAI_TIMEOUT, max_retries=0)
+    
+    @_openai_retry
+    async def _complete_async(self, client: AsyncOpenAI, messages: List[Dict], max_tokens: int = _MAX_TOKENS) -> str:
+        """Throttled, retried chat completion"""
+        # Rough token estimate: ~4 characters per prompt token plus the completion budget
+        estimated_tokens = sum(len(message["content"]) for message in messages) // 4 + max_tokens
+        await asyncio.sleep(self._throttle.reserve(estimated_tokens))
+        response = await client.chat.completions.create(messages=messages, max_tokens=max_tokens, **self._chat_params)
+        return response.choices[0].message.content
+    
+    async def prime_prompt_cache_async(self, client: AsyncOpenAI, include_samples: bool = True) -> bool:
+        """
+        Send the shared system + data prefix once with max_tokens=1, so the concurrent requests
+        that follow find it in OpenAI's prompt cache instead of all paying for the full prefill
+        Skipped when the prefix is too short to be cached. Returns whether a priming request was sent.
+        """
+        if not self.use_openai:
+            return False
+        
+        messages = self._create_messages(".", include_samples=include_samples)
+        if sum(len(message["content"]) for message in messages[:-1]) // 4 < _MIN_CACHED_PREFIX_TOKENS:
+            return False
+        
+        try:
+            await client.chat.completions.create(messages=messages, max_tokens=1, **self._chat_params)
+        except Exception as e:
+            logger.error("Prompt cache priming error: %s", e)
+            return False
+        return True
+    
+    def _create_messages(self, query: str, context: str = "", include_samples: bool = True) -> List[Dict]:
+        """Build the chat messages for an analysis request"""
+        # The system message and data summary form an identical prefix on every request,
+        # so OpenAI's automatic prompt caching serves it from cache; only the last message varies
+        return [
+            {"role": "system", "content": _SYSTEM_MESSAGE},
+            {"role": "user", "content": self._data_summary if include_samples else self._data_overview},
+            {"role": "user", "content": self._create_ai_prompt(query, context)}
+        ]
+    
+    def _prompt_hash(self, context: str, include_samples: bool = True) -> str:
+        """Hash of everything in the prompt except the query, scoping cached answers"""
+        self.data  # loading the data records its fingerprint in _data_hash
+        # Model, system message and prompt template are included so edits to them invalidate old answers
+        prompt = self._create_ai_prompt("", context)
+        return hashlib.sha256(f"{self._chat_params['model']}\n{_SYSTEM_MESSAGE}\n{self._data_hash}\n{include_samples}\n{prompt}".encode("utf-8")).hexdigest()
+    
+    def _embed(self, text: str) -> Optional[List[float]]:
+        """Unit-length embedding of text for the semantic cache, or None if unavailable"""
+        try:
+            response = self.client.embeddings.create(model=EMBEDDING_MODEL, input=text)
+            return normalize(response.data[0].embedding)
+        except Exception as e:
+            logger.warning("Embedding error, skipping semantic cache: %s", e)
+            return None
+    
+    async def _embed_async(self, client: AsyncOpenAI, text: str) -> Optional[List[float]]:
+        """Async variant of _embed"""
+        try:
+            response = await client.embeddings.create(model=EMBEDDING_MODEL, input=text)
+            return normalize(response.data[0].embedding)
+        except Exception as e:
+            logger.warning("Embedding error, skipping semantic cache: %s", e)
+            return None
+    
     def _fallback_response(self, query: str) -> str:
         """Fallback response when OpenAI is not available"""
         return f"I understand you're asking about: {query}\n\nUnfortunately, I cannot provide detailed AI analysis without OpenAI access. Please set your OPENAI_API_KEY environment variable to enable full AI capabilities.\n\nI can still help with basic data analysis if needed."
     
     def analyze_equipment_health(self, equipment_id: int) -> str:
         """AI analysis of specific equipment health"""
+        request = self._equipment_health_request(equipment_id)
+        if not request:
+            return f"Equipment {equipment_id} not found in the data."
+        
+        query, context = request
+        return self.ask_ai(query, context)
+    
+    async def analyze_equipment_health_async(self, equipment_id: int, client: Optional[AsyncOpenAI] = None) -> str:
+        """Async variant of analyze_equipment_health"""
+        request = self._equipment_health_request(equipment_id)
+        if not request:
+            return f"Equipment {equipment_id} not found in the data."
+        
+        query, context = request
+        return await self.ask_ai_async(query, context, client)
+    
+    async def batch_analyze(self, equipment_ids: List[int], concurrency: int = 10,
+                            client: Optional[AsyncOpenAI] = None) -> Dict[int, str]:
+        """
+        AI health analysis for many equipment IDs, with up to `concurrency` requests in flight
+        Pass an AsyncOpenAI client to share its connection pool; otherwise one is opened for the batch.
+        Returns analyses keyed by equipment ID
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        requests_by_id = {equipment_id: self._equipment_health_request(equipment_id) for equipment_id in equipment_ids}
+        
+        async def analyze(equipment_id: int, client: Optional[AsyncOpenAI], embedding: Optional[List[float]]) -> str:
+            request = requests_by_id[equipment_id]
+            if not request:
+                return f"Equipment {equipment_id} not found in the data."
+            
+            query, context = request
+            async with semaphore:
+                return await self.ask_ai_async(query, context, client, embedding=embedding)
+        
+        own_client = client is None and self.use_openai
+        if own_client:
+            client = self.new_async_client()
+        try:
+            # Embed the queries not already answered exactly up front, in as few requests as possible;
+            # ask_ai_async embeds any whose batch failed on its own
+            queries = {
+                equipment_id: request[0] for equipment_id, request in requests_by_id.items()
+                if request and self._semantic_cache.get_exact(request[0], self._prompt_hash(request[1])) is None
+            }
+            embeddings = dict(zip(queries, await embed_texts_async(client, list(queries.values())))) if client else {}
+            
+            analyses = await asyncio.gather(*(
+                analyze(equipment_id, client, embeddings.get(equipment_id)) for equipment_id in equipment_ids
+            ))
+        finally:
+            if own_client:
+                await client.close()
+        
+        return dict(zip(equipment_ids, analyses))
+    
+    def analyze_all_equipment(self, concurrency: int = 10) -> Dict[int, str]:
+        """AI health analysis of every equipment item, run concurrently"""
+        equipment_ids = [e['ID'] for e in self.data['equipment'] if e.get('ID') is not None]
+        return asyncio.run(self.batch_analyze(equipment_ids, concurrency))
+    
+    def _equipment_health_request(self, equipment_id: int) -> Optional[tuple]:
+        """Build the (query, context) for an equipment health analysis, or None if not found"""
         # Find equipment data (check both machines and rolling stock)
-        machine = next((m for m in self.data['machines'] if m.get('id') == str(equipment_id)), None)
-        equipment = next((e for e in self.data['equipment'] if e.get('ID') == equipment_id), None)
+        machine = self._machines_by_id.get(str(equipment_id))
+        equipment = self._equipment_by_id.get(equipment_id)
         
         if not machine and not equipment:
-            return f"Equipment {equipment_id} not found in the data."
+            return None
         
         # Get related parts and activities
-        equipment_parts = [p for p in self.data['spare_parts'] if p.get('ROLLINGSTOCKID') == equipment_id]
-        equipment_activities = [a for a in self.data['activities'] if a.get('ROLLSTOCKCROSSID') == equipment_id]
-        equipment_schedules = [s for s in self.data['maintenance_schedules'] if s.get('rollingstockId') == equipment_id]
-        equipment_movements = [m for m in self.data['movements'] if m.get('ROLLSTOCKID') == equipment_id]
+        equipment_parts = self._parts_by_rollingstock.get(equipment_id, [])
+        equipment_activities = self._activities_by_rollstockcross.get(equipment_id, [])
+        equipment_schedules = self._schedules_by_rollingstock.get(equipment_id, [])
+        equipment_movements = self._movements_by_rollstock.get(equipment_id, [])
         
         context = f"""
 SPECIFIC EQUIPMENT ANALYSIS:
 Equipment ID: {equipment_id}
 
-Machine Data: {json.dumps(machine, indent=2) if machine else "Not found"}
-Equipment Details: {json.dumps(equipment, indent=2) if equipment else "Not found"}
-Related Parts: {json.dumps(equipment_parts, indent=2)}
-Related Activities: {json.dumps(equipment_activities, indent=2)}
-Maintenance Schedules: {json.dumps(equipment_schedules, indent=2)}
-Equipment Movements: {json.dumps(equipment_movements, indent=2)}
+Machine Data: {compact_json(machine) if machine else "Not found"}
+Equipment Details: {compact_json(equipment) if equipment else "Not found"}
+Related Parts: {compact_json(_project(equipment_parts, 'spare_parts'))}
+Related Activities: {compact_json(_project(equipment_activities, 'activities'))}
+Maintenance Schedules: {compact_json(equipment_schedules)}
+Equipment Movements: {compact_json(_project(equipment_movements, 'movements'))}
 """
         
         query = f"Analyze the health and maintenance status of equipment {equipment_id}. Provide a detailed assessment including health score, risk level, maintenance recommendations, and any urgent issues that need attention. Consider the equipment's location, maintenance history, scheduled maintenance, and any recent movements."
         
-        return self.ask_ai(query, context)
+        return query, context
     
     def predict_part_replacement(self, equipment_id: int, part_id: int) -> str:
         """AI prediction for part replacement"""
         # Find part data
-        part_data = [p for p in self.data['spare_parts'] if p.get('SPAREPARTID') == part_id and p.get('ROLLINGSTOCKID') == equipment_id]
+        part_data = self._parts_by_key.get((equipment_id, part_id), [])
         
         if not part_data:
             return f"No data found for part {part_id} on equipment {equipment_id}."
         
         # Get related equipment and maintenance data
-        equipment = next((e for e in self.data['equipment'] if e.get('ID') == equipment_id), None)
-        machine = next((m for m in self.data['machines'] if m.get('rollingstockId') == equipment_id), None)
-        maintenance_schedules = [s for s in self.data['maintenance_schedules'] if s.get('rollingstockId') == equipment_id]
+        equipment = self._equipment_by_id.get(equipment_id)
+        machine = self._machines_by_rollingstock.get(equipment_id)
+        maintenance_schedules = self._schedules_by_rollingstock.get(equipment_id, [])
         
         context = f"""
 PART REPLACEMENT ANALYSIS:
 Equipment ID: {equipment_id}
 Part ID: {part_id}
-Part History: {json.dumps(part_data, indent=2)}
-Equipment Details: {json.dumps(equipment, indent=2) if equipment else "Not found"}
-Machine Data: {json.dumps(machine, indent=2) if machine else "Not found"}
-Maintenance Schedules: {json.dumps(maintenance_schedules, indent=2)}
+Part History: {compact_json(_project(part_data, 'spare_parts'))}
+Equipment Details: {compact_json(equipment) if equipment else "Not found"}
+Machine Data: {compact_json(machine) if machine else "Not found"}
+Maintenance Schedules: {compact_json(maintenance_schedules)}
 """
         
         query = f"Predict when part {part_id} on equipment {equipment_id} needs replacement. Analyze the replacement history, calculate lifecycle patterns, consider maintenance schedules, and provide a prediction with confidence level and risk assessment."
@@ -227,38 +740,60 @@ Maintenance Schedules: {json.dumps(maintenance_schedules, indent=2)}
     
     def generate_maintenance_alerts(self) -> str:
         """AI-generated maintenance alerts"""
+        return self.ask_ai(_ALERTS_QUERY, self._alerts_context, _SUMMARY_MAX_TOKENS)
+    
+    async def generate_maintenance_alerts_async(self, client: Optional[AsyncOpenAI] = None) -> str:
+        """Async variant of generate_maintenance_alerts"""
+        return await self.ask_ai_async(_ALERTS_QUERY, self._alerts_context, client, _SUMMARY_MAX_TOKENS)
+    
+    # Contexts for the system-wide analyses depend only on the loaded data,
+    # so each is rendered once and reused by later calls
+    
+    @cached_property
+    def _alerts_context(self) -> str:
+        """Context for generate_maintenance_alerts"""
         # Get recent activities, parts, and schedules
         recent_activities = self.data['activities'][:50]  # Last 50 activities
         recent_parts = self.data['spare_parts'][:50]  # Last 50 parts
         maintenance_schedules = self.data['maintenance_schedules']
         machines = self.data['machines']
         
-        # Calculate some basic stats
-        urgent_activities = [a for a in recent_activities if a.get('PRIORITY', 0) >= 2]
-        high_cost_parts = [p for p in recent_parts if p.get('UNITPRICE', 0) > 200]
-        upcoming_schedules = [s for s in maintenance_schedules if s.get('nextMaintenanceDate')]
-        
-        context = f"""
+        return f"""
 MAINTENANCE ALERTS ANALYSIS:
-Recent Activities: {json.dumps(recent_activities[:10], indent=2)}
-Recent Parts: {json.dumps(recent_parts[:10], indent=2)}
-Maintenance Schedules: {json.dumps(maintenance_schedules, indent=2)}
-Machines: {json.dumps(machines[:5], indent=2)}
+Recent Activities: {compact_json(_project(recent_activities[:10], 'activities'))}
+Recent Parts: {compact_json(_project(recent_parts[:10], 'spare_parts'))}
+Maintenance Schedules: {compact_json(maintenance_schedules)}
+Machines: {compact_json(machines[:5])}
 
 STATS:
-- Urgent Activities: {len(urgent_activities)}
-- High Cost Parts: {len(high_cost_parts)}
-- Upcoming Schedules: {len(upcoming_schedules)}
+- Urgent Activities: {self._stats['urgent_activities']}
+- High Cost Parts: {self._stats['high_cost_parts']}
+- Upcoming Schedules: {self._stats['upcoming_schedules']}
+"""
+    
+    @cached_property
+    def _costs_context(self) -> str:
+        """Context for analyze_costs"""
+        return f"""
+COST ANALYSIS DATA:
+All Parts: {compact_json(_project(self.data['spare_parts'][:30], 'spare_parts'))}  # First 30 parts for analysis
+"""
+    
+    @cached_property
+    def _system_schedule_context(self) -> str:
+        """Context for the system-wide predict_maintenance_schedule"""
+        return f"""
+SYSTEM MAINTENANCE SCHEDULING:
+All Activities: {compact_json(_project(self.data['activities'][:50], 'activities'))}  # First 50 activities
 """
-        
-        query = "Generate comprehensive maintenance alerts based on the data. Identify urgent issues, upcoming scheduled maintenance, high-cost parts that need attention, equipment health concerns, and any patterns that suggest preventive actions are needed."
-        
-        return self.ask_ai(query, context)
     
     def get_system_insights(self) -> str:
         """Get comprehensive system insights"""
-        query = "Provide a comprehensive analysis of the maintenance system including equipment health, cost analysis, efficiency metrics, risk assessment, and actionable recommendations."
-        return self.ask_ai(query)
+        return self.ask_ai(_INSIGHTS_QUERY, max_tokens=_SUMMARY_MAX_TOKENS)
+    
+    async def get_system_insights_async(self, client: Optional[AsyncOpenAI] = None) -> str:
+        """Async variant of get_system_insights"""
+        return await self.ask_ai_async(_INSIGHTS_QUERY, client=client, max_tokens=_SUMMARY_MAX_TOKENS)
     
     def _search_part_lifespan_online(self, part_name: str, machine_name: str, manufacturer: str = None) -> Optional[int]:
         """
@@ -275,16 +810,17 @@ STATS:
             # Create search query
             search_query = f"{part_name} lifespan maintenance replacement schedule {manufacturer or ''} {machine_name or ''}"
             
-            logger.info(f"🔍 Searching online for: {search_query}")
+            logger.info("🔍 Searching online for: %s", search_query)
             
-            # Perform web search using SerpAPI
-            search = GoogleSearch({
+            # Perform web search using SerpAPI over the agent's pooled connection
+            response = self._search_http.get(_SERPAPI_URL, params={
                 "q": search_query,
                 "api_key": serpapi_key,
+                "engine": "google",
                 "num": 5  # Get top 5 results
             })
-            
-            results = search.get_dict()
+            response.raise_for_status()
+            results = response.json()
             
             # Extract search results
             search_results = []
@@ -300,6 +836,12 @@ STATS:
                 logger.warning("No search results found")
                 return self._search_part_lifespan_openai_only(part_name, machine_name, manufacturer)
             
+            # Skip the model when the snippets already state a clear answer
+            lifespan = _lifespan_from_snippets(search_results)
+            if lifespan:
+                logger.info("✅ Found lifespan in search snippets: %s months", lifespan)
+                return lifespan
+            
             # Use OpenAI to analyze the search results
             analysis_prompt = f"""
 You are a maintenance expert. Analyze the following search results to find the lifespan of this part:
@@ -309,55 +851,36 @@ Machine/Equipment: {machine_name}
 Manufacturer: {manufacturer or 'Unknown'}
 
 SEARCH RESULTS:
-{json.dumps(search_results, indent=2)}
+{compact_json(search_results)}
 
 Please analyze these search results and extract:
 1. The typical lifespan in months for this part
 2. Any specific maintenance intervals mentioned
 3. Factors that affect the lifespan
 
-If you find specific lifespan information, respond with ONLY the number of months.
-If you cannot find specific information, respond with 'UNKNOWN'.
-
-Examples of valid responses:
-- "24" (for 24 months)
-- "12" (for 12 months)
-- "UNKNOWN" (if no specific information found)
+Report the lifespan in months with report_lifespan, or null if the results contain no specific lifespan information.
 """
             
             if self.use_openai:
-                response = openai.ChatCompletion.create(
-                    model="gpt-3.5-turbo",
+                response = self.client.chat.completions.create(
+                    model=self._chat_params["model"],
                     messages=[
-                        {"role": "system", "content": "You are a maintenance expert. Extract specific lifespan information from search results. Respond with only a number (months) or 'UNKNOWN'."},
+                        {"role": "system", "content": "You are a maintenance expert. Extract specific lifespan information from search results."},
                         {"role": "user", "content": analysis_prompt}
                     ],
-                    temperature=0.1,
-                    max_tokens=50
+                    **_LIFESPAN_PARAMS
                 )
                 
-                result = response.choices[0].message.content.strip()
-                
-                # Try to extract a number from the response
-                if result.isdigit():
-                    lifespan = int(result)
-                    logger.info(f"✅ Found lifespan from web search: {lifespan} months")
+                lifespan = _reported_months(response.choices[0].message)
+                if lifespan:
+                    logger.info("✅ Found lifespan from web search: %s months", lifespan)
                     return lifespan
-                elif "UNKNOWN" in result.upper():
-                    logger.warning("No specific lifespan found in search results")
-                    return None
-                else:
-                    # Try to extract number from text
-                    numbers = re.findall(r'\d+', result)
-                    if numbers:
-                        lifespan = int(numbers[0])
-                        logger.info(f"✅ Extracted lifespan from text: {lifespan} months")
-                        return lifespan
+                logger.warning("No specific lifespan found in search results")
             
             return None
             
         except Exception as e:
-            logger.error(f"Error searching for part lifespan: {e}")
+            logger.error("Error searching for part lifespan: %s", e)
             return self._search_part_lifespan_openai_only(part_name, machine_name, manufacturer)
     
     def _search_part_lifespan_openai_only(self, part_name: str, machine_name: str, manufacturer: str = None) -> Optional[int]:
@@ -381,37 +904,25 @@ Please provide:
 
 If you cannot find specific information, provide a reasonable estimate based on similar parts.
 
-Respond with ONLY a number representing the lifespan in months, or 'UNKNOWN' if you cannot determine it.
+Report the lifespan in months with report_lifespan, or null if you cannot determine it.
 """
             
             if self.use_openai:
-                response = openai.ChatCompletion.create(
-                    model="gpt-3.5-turbo",
+                response = self.client.chat.completions.create(
+                    model=self._chat_params["model"],
                     messages=[
                         {"role": "system", "content": "You are a maintenance expert. Provide accurate lifespan information based on manufacturer specifications and industry standards."},
                         {"role": "user", "content": prompt}
                     ],
-                    temperature=0.1,
-                    max_tokens=100
+                    **_LIFESPAN_PARAMS
                 )
                 
-                result = response.choices[0].message.content.strip()
-                
-                # Try to extract a number from the response
-                if result.isdigit():
-                    return int(result)
-                elif "UNKNOWN" in result.upper():
-                    return None
-                else:
-                    # Try to extract number from text
-                    numbers = re.findall(r'\d+', result)
-                    if numbers:
-                        return int(numbers[0])
+                return _reported_months(response.choices[0].message)
             
             return None
             
         except Exception as e:
-            logger.error(f"Error in OpenAI-only search: {e}")
+            logger.error("Error in OpenAI-only search: %s", e)
             return None
     
     def get_online_part_lifespan(self, part_id: int) -> Optional[int]:
@@ -419,114 +930,320 @@ Respond with ONLY a number representing the lifespan in months, or 'UNKNOWN' if
         Get part lifespan using enhanced lookup system
         Returns lifespan in months, or None if not found
         """
-        # Import the simple lifespan lookup
-        try:
-            from simple_lifespan_solution import SimpleLifespanLookup
-            lookup = SimpleLifespanLookup()
-        except ImportError:
+        lookup = self._lifespan_lookup
+        if lookup is None:
             logger.warning("Simple lifespan lookup not available, using fallback")
             return self._get_fallback_lifespan(part_id)
         
-        # Find part information from data
-        part_info = None
-        for part in self.data['spare_parts']:
-            if part.get('SPAREPARTID') == part_id:
-                # Find the associated machine
-                machine_id = part.get('ROLLINGSTOCKID')
-                machine = None
-                for m in self.data['machines']:
-                    if m.get('rollingstockId') == machine_id:
-                        machine = m
-                        break
-                
-                part_info = {
-                    'part_name': part.get('NOTE', f'Part {part_id}'),
-                    'machine_name': machine.get('name', 'Unknown Machine') if machine else 'Unknown Machine',
-                    'manufacturer': machine.get('producer', 'Unknown') if machine else 'Unknown',
-                    'part_id': part_id
-                }
-                break
-        
+        part_info = self._part_info(part_id)
         if not part_info:
-            logger.warning(f"Part {part_id} not found in database")
+            logger.warning("Part %s not found in database", part_id)
             return None
         
-        logger.info(f"🔍 Looking up lifespan for {part_info['part_name']} on {part_info['machine_name']}")
+        logger.info("🔍 Looking up lifespan for %s on %s", part_info['part_name'], part_info['machine_name'])
         
         # Use enhanced lookup
-        lifespan = lookup.get_smart_lifespan(
-            part_info['part_name'],
-            part_info['machine_name'],
-            part_info['manufacturer']
-        )
+        lifespan = self._cached_lifespan(part_info, lookup.get_smart_lifespan)
         
         if lifespan:
-            logger.info(f"✅ Found lifespan for part {part_id}: {lifespan} months")
+            logger.info("✅ Found lifespan for part %s: %s months", part_id, lifespan)
         else:
-            logger.warning(f"❌ No lifespan found for part {part_id}, using fallback")
+            logger.warning("❌ No lifespan found for part %s, using fallback", part_id)
             lifespan = self._get_fallback_lifespan(part_id)
         
         return lifespan
     
+    @cached_property
+    def _lifespan_lookup(self):
+        """Shared SimpleLifespanLookup, created on first use, or None if not installed"""
+        return SimpleLifespanLookup() if SimpleLifespanLookup else None
+    
+    def bulk_lifespans(self, part_ids: List[int], max_workers: int = 8) -> Dict[int, Optional[int]]:
+        """
+        Online lifespan search for many parts, with up to `max_workers` searches in flight
+        Each search waits on SerpAPI and then OpenAI, so running parts on threads overlaps that I/O.
+        Returns months keyed by part ID: the found lifespan, else the default, or None for unknown parts.
+        """
+        def lookup(part_id: int) -> Optional[int]:
+            part_info = self._part_info(part_id)
+            if not part_info:
+                logger.warning("Part %s not found in database", part_id)
+                return None
+            
+            lifespan = self._cached_lifespan(part_info, self._search_part_lifespan_online)
+            return lifespan or self._get_fallback_lifespan(part_id)
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return dict(zip(part_ids, executor.map(lookup, part_ids)))
+    
+    def _cached_lifespan(self, part_info: Dict, lookup: Callable[[str, str, str], Optional[int]]) -> Optional[int]:
+        """Lifespan from lookup(part_name, machine_name, manufacturer), remembered when found"""
+        key = (part_info['part_name'], part_info['machine_name'], part_info['manufacturer'])
+        with self._lifespan_lock:
+            lifespan = self._lifespan_cache.get(key)
+            if lifespan is not None:
+                self._lifespan_cache.move_to_end(key)
+                return lifespan
+        
+        lifespan = lookup(*key)
+        if lifespan:
+            with self._lifespan_lock:
+                self._lifespan_cache[key] = lifespan
+                self._lifespan_cache.move_to_end(key)
+                if len(self._lifespan_cache) > _LIFESPAN_CACHE_SIZE:
+                    self._lifespan_cache.popitem(last=False)
+        return lifespan
+    
+    def _part_info(self, part_id: int) -> Optional[Dict]:
+        """Name, machine and manufacturer of a part for lifespan lookups, or None if not found"""
+        part = self._parts_by_id.get(part_id)
+        if not part:
+            return None
+        
+        # Find the associated machine
+        machine = self._machines_by_rollingstock.get(part.get('ROLLINGSTOCKID'))
+        
+        return {
+            'part_name': part.get('NOTE', f'Part {part_id}'),
+            'machine_name': machine.get('name', 'Unknown Machine') if machine else 'Unknown Machine',
+            'manufacturer': machine.get('producer', 'Unknown') if machine else 'Unknown',
+            'part_id': part_id
+        }
+    
     def _get_fallback_lifespan(self, part_id: int) -> int:
         """Fallback lifespan using default values"""
-        # Default lifespans for common parts
-        default_lifespans = {
-            3: 12,   # Air filter - 1 year
-            4: 24,   # Oil filter - 2 years
-            9: 6,    # Fuel filter - 6 months
-            5: 18,   # Belt - 1.5 years
-            6: 12,   # Bearing - 1 year
-            7: 24,   # Seal - 2 years
-            8: 18,   # Sensor - 1.5 years
-            10: 12,  # Motor - 1 year
-            11: 6,   # Battery - 6 months
-            12: 24,  # Screen - 2 years
-            13: 18,  # Component - 1.5 years
-            14: 12,  # Part - 1 year
-            15: 24,  # Assembly - 2 years
-            16: 18,  # Module - 1.5 years
-            17: 12,  # Unit - 1 year
-        }
-        
-        return default_lifespans.get(part_id, 12)  # Default 12 months
+        return _FALLBACK_LIFESPANS.get(part_id, 12)  # Default 12 months
     
     def chat_with_ai(self, user_message: str) -> str:
         """General AI chat for any maintenance-related questions"""
-        return self.ask_ai(user_message)
+        # Free-form questions aren't about the sample records, so send just the data overview
+        return self.ask_ai(user_message, include_samples=False)
     
-    def analyze_costs(self) -> str:
-        """AI analysis of maintenance costs"""
-        context = f"""
-COST ANALYSIS DATA:
-All Parts: {json.dumps(self.data['spare_parts'][:30], indent=2)}  # First 30 parts for analysis
-"""
+    async def chat_with_ai_async(self, user_message: str, client: Optional[AsyncOpenAI] = None) -> str:
+        """Async variant of chat_with_ai, so several questions can be asked concurrently"""
+        return await self.ask_ai_async(user_message, client=client, include_samples=False)
+    
+    async def chat_with_ai_stream(self, user_message: str, client: Optional[AsyncOpenAI] = None) -> AsyncIterator[str]:
+        """
+        Streaming variant of chat_with_ai_async, yielding the answer piece by piece as it is generated
+        A cached answer is yielded in one piece.
+        """
+        if not self.use_openai:
+            yield self._fallback_response(user_message)
+            return
+        
+        if client is None:
+            async with self.new_async_client() as client:
+                async for text in self.chat_with_ai_stream(user_message, client):
+                    yield text
+            return
         
-        query = "Analyze the maintenance costs, identify cost trends, expensive parts, cost optimization opportunities, and provide recommendations for cost management."
+        prompt_hash = self._prompt_hash("", include_samples=False)
+        cached = self._semantic_cache.get_exact(user_message, prompt_hash)
+        if cached is not None:
+            logger.info("⚡ Exact cache hit")
+            yield cached
+            return
         
-        return self.ask_ai(query, context)
+        pieces = []
+        try:
+            embedding = await self._embed_async(client, user_message)
+            if embedding:
+                cached = self._semantic_cache.lookup(embedding, prompt_hash)
+                if cached is not None:
+                    logger.info("⚡ Semantic cache hit")
+                    self._semantic_cache.add_exact(user_message, cached, prompt_hash)
+                    yield cached
+                    return
+            
+            messages = self._create_messages(user_message, include_samples=False)
+            estimated_tokens = sum(len(message["content"]) for message in messages) // 4 + _MAX_TOKENS
+            await asyncio.sleep(self._throttle.reserve(estimated_tokens))
+            stream = await client.chat.completions.create(
+                messages=messages,
+                stream=True,
+                max_tokens=_MAX_TOKENS,
+                **self._chat_params
+            )
+            
+            async for chunk in stream:
+                text = chunk.choices[0].delta.content if chunk.choices else None
+                if text:
+                    pieces.append(text)
+                    yield text
+        except Exception as e:
+            logger.error("OpenAI API error: %s", e)
+            if not pieces:
+                yield self._fallback_response(user_message)
+            return
+        
+        answer = "".join(pieces)
+        self._semantic_cache.add_exact(user_message, answer, prompt_hash)
+        if embedding:
+            self._semantic_cache.add(embedding, answer, prompt_hash)
+    
+    def submit_chat_batch(self, questions: Sequence[str]) -> Optional[str]:
+        """
+        Submit chat questions through the OpenAI Batch API
+        Half the price of direct calls, for known questions that can wait (24h completion window).
+        Returns the batch id, or None if the batch could not be created
+        """
+        if not self.use_openai:
+            logger.warning("No OpenAI API key found. Cannot submit batch.")
+            return None
+        
+        lines = [
+            orjson.dumps({
+                "custom_id": str(i),
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "messages": self._create_messages(question, include_samples=False),
+                    "max_tokens": _MAX_TOKENS,
+                    **self._chat_params
+                }
+            })
+            for i, question in enumerate(questions)
+        ]
+        
+        try:
+            upload = self.client.files.create(file=("chat.jsonl", b"\n".join(lines)), purpose="batch")
+            batch = self.client.batches.create(
+                input_file_id=upload.id,
+                endpoint="/v1/chat/completions",
+                completion_window="24h"
+            )
+        except Exception as e:
+            logger.error("Batch submission error: %s", e)
+            return None
+        
+        logger.info("📦 Submitted chat batch %s for %s questions", batch.id, len(questions))
+        return batch.id
+    
+    def collect_chat_batch(self, batch_id: str, questions: Sequence[str]) -> Optional[Dict[str, str]]:
+        """
+        Fetch the answers of a batch created by submit_chat_batch with the same questions
+        Answers are stored in the response cache, so later chat_with_ai calls are served locally.
+        Returns answers by question, or None while the batch is still running (or couldn't be checked);
+        raises BatchFailedError once the batch has ended without answers
+        """
+        if not self.use_openai:
+            raise BatchFailedError("No OpenAI API key found. Cannot collect batch.")
+        
+        try:
+            batch = self.client.batches.retrieve(batch_id)
+        except Exception as e:
+            logger.error("Batch retrieval error: %s", e)
+            return None
+        
+        if batch.status in _BATCH_FAILED_STATUSES:
+            raise BatchFailedError(f"Chat batch {batch_id} is {batch.status}")
+        if batch.status != "completed":
+            logger.info("⏳ Chat batch %s is %s", batch_id, batch.status)
+            return None
+        # Completed with every request failed: there is only an error file
+        if batch.output_file_id is None:
+            raise BatchFailedError(f"Chat batch {batch_id} completed without any answers")
+        
+        try:
+            output = self.client.files.content(batch.output_file_id)
+        except Exception as e:
+            logger.error("Batch retrieval error: %s", e)
+            return None
+        
+        prompt_hash = self._prompt_hash("", include_samples=False)
+        answers = {}
+        for line in output.text.splitlines():
+            if not line.strip():
+                continue
+            record = orjson.loads(line)
+            body = (record.get("response") or {}).get("body")
+            index = int(record["custom_id"])
+            if not body or index >= len(questions):
+                continue
+            
+            answer = body["choices"][0]["message"]["content"]
+            answers[questions[index]] = answer
+            self._semantic_cache.add_exact(questions[index], answer, prompt_hash)
+        
+        logger.info("✅ Collected %s answers from chat batch %s", len(answers), batch_id)
+        return answers
+    
+    def analyze_costs(self) -> str:
+        """AI analysis of maintenance costs"""
+        return self.ask_ai(_COSTS_QUERY, self._costs_context, _SUMMARY_MAX_TOKENS)
     
     def predict_maintenance_schedule(self, equipment_id: int = None) -> str:
         """AI prediction for maintenance scheduling"""
         if equipment_id:
             # Specific equipment
-            equipment_activities = [a for a in self.data['activities'] if a.get('ROLLINGSTOCKID') == equipment_id]
+            equipment_activities = self._activities_by_rollingstock.get(equipment_id, [])
             context = f"""
 MAINTENANCE SCHEDULING FOR EQUIPMENT {equipment_id}:
-Activities: {json.dumps(equipment_activities, indent=2)}
+Activities: {compact_json(_project(equipment_activities, 'activities'))}
 """
             query = f"Predict the optimal maintenance schedule for equipment {equipment_id}. Analyze activity patterns, recommend maintenance intervals, and identify the best timing for preventive maintenance."
         else:
             # System-wide
-            context = f"""
-SYSTEM MAINTENANCE SCHEDULING:
-All Activities: {json.dumps(self.data['activities'][:50], indent=2)}  # First 50 activities
-"""
-            query = "Analyze the overall maintenance scheduling patterns, identify optimal maintenance intervals for different equipment types, and provide a comprehensive maintenance scheduling strategy."
+            return self.ask_ai(_SYSTEM_SCHEDULE_QUERY, self._system_schedule_context, _SUMMARY_MAX_TOKENS)
         
         return self.ask_ai(query, context)
+    
+    def analyze_batch(self, analyses: List[str]) -> List[str]:
+        """
+        Run several system-wide analyses ('insights', 'alerts', 'costs', 'schedule') in one AI request
+        Returns one answer per analysis, in order
+        """
+        requests = {
+            'insights': lambda: (_INSIGHTS_QUERY, ""),
+            'alerts': lambda: (_ALERTS_QUERY, self._alerts_context),
+            'costs': lambda: (_COSTS_QUERY, self._costs_context),
+            'schedule': lambda: (_SYSTEM_SCHEDULE_QUERY, self._system_schedule_context)
+        }
+        return self.ask_ai_batch([requests[analysis]() for analysis in analyses], _SUMMARY_MAX_TOKENS)
+    
+    def ask_ai_batch(self, requests: List[tuple], max_tokens: int = _MAX_TOKENS) -> List[str]:
+        """
+        Answer several (query, context) requests with one completion, sharing the data summary
+        `max_tokens` is the budget per request. If the combined answer cannot be split back
+        into one part per request, each request is asked on its own instead.
+        """
+        if len(requests) == 1 or not self.use_openai:
+            return [self.ask_ai(query, context, max_tokens) for query, context in requests]
+        
+        numbered = "\n".join(f"{i}) {query}" for i, (query, _) in enumerate(requests, 1))
+        query = f"Answer each of the following numbered queries independently. Begin the answer to query N with a line containing only '### N'.\n{numbered}"
+        # Requests for the same analysis share one copy of its context
+        context = "\n".join(dict.fromkeys(context for _, context in requests if context))
+        
+        try:
+            response = self.client.chat.completions.create(
+                messages=self._create_messages(query, context),
+                max_tokens=max_tokens * len(requests),
+                **self._chat_params
+            )
+            parts = _BATCH_ANSWER_RE.split(response.choices[0].message.content)
+            # parts is [preamble, number, answer, number, answer, ...]
+            answers = {int(number): answer.strip() for number, answer in zip(parts[1::2], parts[2::2])}
+            if sorted(answers) == list(range(1, len(requests) + 1)):
+                return [answers[i] for i in range(1, len(requests) + 1)]
+            logger.warning("Batched answer could not be split per query; asking each query separately")
+        except Exception as e:
+            logger.error("OpenAI API error: %s", e)
+        
+        return [self.ask_ai(query, context, max_tokens) for query, context in requests]
 
 # CLI Interface for the OpenAI AI Agent
+_SPINNER = "⠋⠙⠹⠸⠼⠴⠦⠧⠇⠏"
+
+# Analyses accepted by the batch command, with their section titles
+_BATCH_ANALYSES = {
+    'insights': "📊 System Insights",
+    'alerts': "🚨 Maintenance Alerts",
+    'costs': "💰 Cost Analysis",
+    'schedule': "📅 System-wide Maintenance Schedule"
+}
+
 class OpenAI_AI_CLI:
     def __init__(self):
         self.agent = None
@@ -543,6 +1260,65 @@ class OpenAI_AI_CLI:
             print(f"❌ Error initializing AI Agent: {e}")
             return False
     
+    def _print_response(self, method, *args):
+        """
+        Run an agent method on a worker thread, printing the AI answer as it streams in
+        A spinner shows until the first token arrives; Ctrl-C abandons the answer and returns to the prompt.
+        """
+        streamed = []
+        outcome = {}
+        output_lock = threading.Lock()
+        cancelled = threading.Event()
+        
+        def on_token(text: str):
+            with output_lock:
+                if cancelled.is_set():
+                    return
+                if not streamed:
+                    print("\r \r", end="")  # clear the spinner
+                streamed.append(text)
+                print(text, end="", flush=True)
+        
+        def work():
+            # The callback is bound to this worker thread's context only, so an abandoned
+            # answer still finishing here can never write into a later command's output
+            _on_token.set(on_token)
+            try:
+                outcome['result'] = method(*args)
+            except Exception as e:
+                outcome['error'] = e
+        
+        worker = threading.Thread(target=work, daemon=True)
+        worker.start()
+        try:
+            for frame in itertools.cycle(_SPINNER):
+                worker.join(0.1)
+                if not worker.is_alive():
+                    break
+                with output_lock:
+                    if not streamed:
+                        print(f"\r{frame}", end="", flush=True)
+        except KeyboardInterrupt:
+            # The worker finishes in the background with its output suppressed
+            with output_lock:
+                cancelled.set()
+            print("\n⏹️ Response cancelled")
+            return
+        
+        if not streamed:
+            print("\r \r", end="")
+        if 'error' in outcome:
+            raise outcome['error']
+        result = outcome['result']
+        
+        # Cached, fallback and not-found answers are returned without streaming
+        if streamed and result == "".join(streamed):
+            print()
+        else:
+            if streamed:
+                print()
+            print(result)
+    
     def show_help(self):
         """Show help information"""
         help_text = """
@@ -553,10 +1329,12 @@ Available Commands:
   insights, i               - Get AI-generated system insights
   alerts, a                 - Get AI-generated maintenance alerts
   equipment <id>, e <id>    - AI analysis of specific equipment
+  analyze-all               - AI analysis of all equipment (concurrent)
   parts <equipment_id> <part_id> - AI prediction for part replacement
   chat <message>            - Chat with AI about anything
   costs                     - AI analysis of maintenance costs
   schedule [equipment_id]   - AI maintenance scheduling prediction
+  batch <analysis> ...      - Run insights/alerts/costs/schedule in one AI request
   quit, q, exit            - Exit the application
 
 Examples:
@@ -565,6 +1343,7 @@ Examples:
   parts 1 4079             - AI prediction for part 4079 on equipment 1
   schedule                  - System-wide maintenance scheduling
   costs                     - Cost analysis and optimization
+  batch insights alerts costs - Three system-wide analyses in one request
         """
         print(help_text)
     
@@ -578,6 +1357,21 @@ Examples:
         print("Type 'quit' to exit")
         print("💡 Set OPENAI_API_KEY environment variable for full AI capabilities")
         
+        # Command name and alias -> handler taking the command's arguments
+        handlers = {
+            'quit': self._do_quit, 'q': self._do_quit, 'exit': self._do_quit,
+            'help': self._do_help, 'h': self._do_help,
+            'insights': self._do_insights, 'i': self._do_insights,
+            'alerts': self._do_alerts, 'a': self._do_alerts,
+            'equipment': self._do_equipment, 'e': self._do_equipment,
+            'analyze-all': self._do_analyze_all,
+            'parts': self._do_parts,
+            'chat': self._do_chat,
+            'costs': self._do_costs,
+            'schedule': self._do_schedule,
+            'batch': self._do_batch
+        }
+        
         while self.running:
             try:
                 command = input("\n🤖 AI> ").strip()
@@ -587,78 +1381,11 @@ Examples:
                 
                 parts = command.split()
                 cmd = parts[0].lower()
-                args = parts[1:] if len(parts) > 1 else []
-                
-                if cmd in ['quit', 'q', 'exit']:
-                    print("👋 Goodbye!")
-                    self.running = False
-                
-                elif cmd in ['help', 'h']:
-                    self.show_help()
-                
-                elif cmd in ['insights', 'i']:
-                    print("\n📊 Generating AI insights...")
-                    insights = self.agent.get_system_insights()
-                    print(insights)
-                
-                elif cmd in ['alerts', 'a']:
-                    print("\n🚨 Generating AI alerts...")
-                    alerts = self.agent.generate_maintenance_alerts()
-                    print(alerts)
-                
-                elif cmd in ['equipment', 'e']:
-                    if args:
-                        try:
-                            equipment_id = int(args[0])
-                            print(f"\n🔍 AI Analysis of Equipment {equipment_id}...")
-                            analysis = self.agent.analyze_equipment_health(equipment_id)
-                            print(analysis)
-                        except ValueError:
-                            print("❌ Please provide a valid equipment ID")
-                    else:
-                        print("❌ Please provide equipment ID")
-                
-                elif cmd == 'parts':
-                    if len(args) >= 2:
-                        try:
-                            equipment_id = int(args[0])
-                            part_id = int(args[1])
-                            print(f"\n🔧 AI Prediction for Part {part_id} on Equipment {equipment_id}...")
-                            prediction = self.agent.predict_part_replacement(equipment_id, part_id)
-                            print(prediction)
-                        except ValueError:
-                            print("❌ Please provide valid equipment ID and part ID")
-                    else:
-                        print("❌ Please provide equipment ID and part ID")
-                
-                elif cmd == 'chat':
-                    if args:
-                        message = ' '.join(args)
-                        print(f"\n💬 AI Response:")
-                        response = self.agent.chat_with_ai(message)
-                        print(response)
-                    else:
-                        print("❌ Please provide a message")
-                
-                elif cmd == 'costs':
-                    print("\n💰 AI Cost Analysis...")
-                    analysis = self.agent.analyze_costs()
-                    print(analysis)
-                
-                elif cmd == 'schedule':
-                    if args:
-                        try:
-                            equipment_id = int(args[0])
-                            print(f"\n📅 AI Maintenance Schedule for Equipment {equipment_id}...")
-                            schedule = self.agent.predict_maintenance_schedule(equipment_id)
-                            print(schedule)
-                        except ValueError:
-                            print("❌ Please provide a valid equipment ID")
-                    else:
-                        print("\n📅 AI System-wide Maintenance Schedule...")
-                        schedule = self.agent.predict_maintenance_schedule()
-                        print(schedule)
+                args = parts[1:]
                 
+                handler = handlers.get(cmd)
+                if handler:
+                    handler(args)
                 else:
                     print(f"❌ Unknown command: {cmd}")
                     print("Type 'help' for available commands")
@@ -668,6 +1395,87 @@ Examples:
                 self.running = False
             except Exception as e:
                 print(f"❌ Error: {e}")
+    
+    def _do_quit(self, args: List[str]):
+        print("👋 Goodbye!")
+        self.running = False
+    
+    def _do_help(self, args: List[str]):
+        self.show_help()
+    
+    def _do_insights(self, args: List[str]):
+        print("\n📊 Generating AI insights...")
+        self._print_response(self.agent.get_system_insights)
+    
+    def _do_alerts(self, args: List[str]):
+        print("\n🚨 Generating AI alerts...")
+        self._print_response(self.agent.generate_maintenance_alerts)
+    
+    def _do_equipment(self, args: List[str]):
+        if args:
+            try:
+                equipment_id = int(args[0])
+                print(f"\n🔍 AI Analysis of Equipment {equipment_id}...")
+                self._print_response(self.agent.analyze_equipment_health, equipment_id)
+            except ValueError:
+                print("❌ Please provide a valid equipment ID")
+        else:
+            print("❌ Please provide equipment ID")
+    
+    def _do_analyze_all(self, args: List[str]):
+        print("\n🔍 AI Analysis of all equipment...")
+        analyses = self.agent.analyze_all_equipment()
+        for equipment_id, analysis in analyses.items():
+            print(f"\n--- Equipment {equipment_id} ---")
+            print(analysis)
+    
+    def _do_parts(self, args: List[str]):
+        if len(args) >= 2:
+            try:
+                equipment_id = int(args[0])
+                part_id = int(args[1])
+                print(f"\n🔧 AI Prediction for Part {part_id} on Equipment {equipment_id}...")
+                self._print_response(self.agent.predict_part_replacement, equipment_id, part_id)
+            except ValueError:
+                print("❌ Please provide valid equipment ID and part ID")
+        else:
+            print("❌ Please provide equipment ID and part ID")
+    
+    def _do_chat(self, args: List[str]):
+        if args:
+            message = ' '.join(args)
+            print(f"\n💬 AI Response:")
+            self._print_response(self.agent.chat_with_ai, message)
+        else:
+            print("❌ Please provide a message")
+    
+    def _do_costs(self, args: List[str]):
+        print("\n💰 AI Cost Analysis...")
+        self._print_response(self.agent.analyze_costs)
+    
+    def _do_schedule(self, args: List[str]):
+        if args:
+            try:
+                equipment_id = int(args[0])
+                print(f"\n📅 AI Maintenance Schedule for Equipment {equipment_id}...")
+                self._print_response(self.agent.predict_maintenance_schedule, equipment_id)
+            except ValueError:
+                print("❌ Please provide a valid equipment ID")
+        else:
+            print("\n📅 AI System-wide Maintenance Schedule...")
+            self._print_response(self.agent.predict_maintenance_schedule)
+    
+    def _do_batch(self, args: List[str]):
+        analyses = [arg.lower() for arg in args]
+        unknown = [analysis for analysis in analyses if analysis not in _BATCH_ANALYSES]
+        if not analyses or unknown:
+            print(f"❌ Please provide analyses to batch: {', '.join(_BATCH_ANALYSES)}")
+            return
+        
+        print(f"\n📦 Running {len(analyses)} analyses in one AI request...")
+        for analysis, answer in zip(analyses, self.agent.analyze_batch(analyses)):
+            print(f"\n--- {_BATCH_ANALYSES[analysis]} ---")
+            print(answer)
 
 def main():
     """Main function"""
@@ -3,59 +3,203 @@
 Simple CLI to test the OpenAI AI Agent
 """
 
-from openai_ai_agent import OpenAI_SparePartsAgent
+import argparse
+import asyncio
+import sys
+from openai_ai_agent import BatchFailedError, OpenAI_SparePartsAgent
 
-def main():
+# Questions asked in the chat test
+CHAT_QUESTIONS = (
+    "How is the overall system health?",
+    "Which equipment needs immediate attention?",
+    "What are the most expensive maintenance items?",
+    "When should I schedule the next maintenance?"
+)
+
+# Most equipment analyses in flight at once with --all-equipment
+ALL_EQUIPMENT_CONCURRENCY = 8
+
+# Seconds between status checks of a submitted chat batch
+BATCH_POLL_INTERVAL = 30
+
+# Seconds to wait for a chat batch before giving up: the 24h completion window plus some slack
+BATCH_DEADLINE = 25 * 3600
+
+async def chat_via_batch(agent: OpenAI_SparePartsAgent, questions: tuple) -> list:
+    """Answer the chat questions through the Batch API, waiting until the batch ends or BATCH_DEADLINE passes"""
+    batch_id = await asyncio.to_thread(agent.submit_chat_batch, questions)
+    if batch_id is None:
+        return ["Batch submission failed."] * len(questions)
+    
+    print(f"📦 Submitted chat batch {batch_id}, waiting for completion...")
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + BATCH_DEADLINE
+    answers = None
+    while answers is None:
+        if loop.time() >= deadline:
+            return [f"Batch {batch_id} did not complete within {BATCH_DEADLINE // 3600}h."] * len(questions)
+        await asyncio.sleep(BATCH_POLL_INTERVAL)
+        try:
+            answers = await asyncio.to_thread(agent.collect_chat_batch, batch_id, questions)
+        except BatchFailedError as e:
+            return [f"❌ {e}"] * len(questions)
+    return [answers.get(question, "No answer returned by the batch.") for question in questions]
+
+async def analyze_equipment(agent: OpenAI_SparePartsAgent, equipment_ids: list, client, all_equipment: bool):
+    """Analyze the first equipment ID, or with all_equipment every ID (returned by ID)"""
+    if all_equipment:
+        return await agent.batch_analyze(equipment_ids, concurrency=ALL_EQUIPMENT_CONCURRENCY, client=client)
+    if not equipment_ids:
+        return None
+    return await agent.analyze_equipment_health_async(equipment_ids[0], client)
+
+async def run_step(name: str, awaitable) -> tuple:
+    """
+    Await one test step, returning (ok, value) so a failing step doesn't abort the others
+    On failure the value is the error message, printed in the step's place.
+    """
+    try:
+        return True, await awaitable
+    except Exception as e:
+        return False, f"❌ {name} failed: {e}"
+
+async def buffer_stream(stream, queue: asyncio.Queue):
+    """Move the pieces of a streamed answer into a queue, ending with None"""
+    try:
+        async for text in stream:
+            queue.put_nowait(text)
+    except Exception as e:
+        queue.put_nowait(f"❌ Error: {e}")
+    finally:
+        queue.put_nowait(None)
+
+async def buffer_batch(agent: OpenAI_SparePartsAgent, questions: tuple, queues: list):
+    """Put each batch answer into its question's queue, ending each with None"""
+    try:
+        for queue, answer in zip(queues, await chat_via_batch(agent, questions)):
+            queue.put_nowait(answer)
+    except Exception as e:
+        for queue in queues:
+            queue.put_nowait(f"❌ Error: {e}")
+    finally:
+        for queue in queues:
+            queue.put_nowait(None)
+
+async def main(use_batch: bool = False, model: str = "gpt-4o-mini", all_equipment: bool = False):
     print("🤖 Testing OpenAI AI Agent...")
     
     try:
         # Initialize the agent
-        agent = OpenAI_SparePartsAgent()
+        agent = OpenAI_SparePartsAgent(model=model)
         
         print("✅ Agent initialized successfully!")
         print("=" * 50)
         
-        # Test system insights
-        print("\n📊 Testing AI System Insights...")
-        insights = agent.get_system_insights()
-        print(insights)
-        
-        print("\n" + "=" * 50)
-        
-        # Test alerts
-        print("\n🚨 Testing AI Alerts...")
-        alerts = agent.generate_maintenance_alerts()
-        print(alerts)
-        
-        print("\n" + "=" * 50)
+        # Every test is independent, so all requests run at once over one shared client
+        # and the results are printed in order afterwards. Chat answers stream into queues
+        # and are printed as they arrive, so the first tokens show up without waiting for
+        # the whole answer. With --batch the chat questions go through the Batch API instead:
+        # half the cost, but it can take up to 24h
+        # Records without an ID can't be looked up, so they are skipped (as in analyze_all_equipment)
+        equipment_ids = [record['ID'] for record in agent.data['equipment'] if record.get('ID') is not None]
+        equipment_id = equipment_ids[0] if equipment_ids else None
+        client = agent.new_async_client() if agent.use_openai else None
+        queues = [asyncio.Queue() for _ in CHAT_QUESTIONS]
+        if use_batch and agent.use_openai:
+            chats = [asyncio.create_task(buffer_batch(agent, CHAT_QUESTIONS, queues))]
+        else:
+            chats = [
+                asyncio.create_task(buffer_stream(agent.chat_with_ai_stream(question, client), queue))
+                for question, queue in zip(CHAT_QUESTIONS, queues)
+            ]
+        try:
+            # The analyses share the long system + data prefix: prime OpenAI's prompt cache with it
+            # first so all three hit it. The chat prefix is too short to be cached, so chats don't wait
+            if client:
+                await agent.prime_prompt_cache_async(client)
+            
+            # Each step fails on its own: the others still print, and their answers are cached
+            steps = await asyncio.gather(
+                run_step("System insights", agent.get_system_insights_async(client)),
+                run_step("Alerts", agent.generate_maintenance_alerts_async(client)),
+                run_step("Equipment analysis", analyze_equipment(agent, equipment_ids, client, all_equipment))
+            )
+            (_, insights), (_, alerts), (analysis_ok, analysis) = steps
+            
+            # The finished sections are written in one go; only the streamed chat answers are flushed piecemeal
+            out = []
+            
+            # Test system insights
+            out.append("\n📊 Testing AI System Insights...")
+            out.append(insights)
+            
+            out.append("\n" + "=" * 50)
+            
+            # Test alerts
+            out.append("\n🚨 Testing AI Alerts...")
+            out.append(alerts)
+            
+            out.append("\n" + "=" * 50)
+            
+            # Test equipment analysis
+            out.append("\n🔍 Testing Equipment Analysis...")
+            if all_equipment and analysis_ok:
+                for analyzed_id, text in analysis.items():
+                    out.append(f"\nEquipment {analyzed_id}:")
+                    out.append(text)
+            elif equipment_id is not None:
+                out.append(analysis)
+            
+            out.append("\n" + "=" * 50)
+            sys.stdout.write("\n".join(out) + "\n")
+            
+            # Test AI chat
+            print("\n💬 Testing AI Chat...")
+            for question, queue in zip(CHAT_QUESTIONS, queues):
+                print(f"\nQ: {question}")
+                print("A: ", end="", flush=True)
+                while (text := await queue.get()) is not None:
+                    print(text, end="", flush=True)
+                print()
+            await asyncio.gather(*chats)
+        finally:
+            for chat in chats:
+                chat.cancel()
+            if client:
+                await client.close()
         
-        # Test equipment analysis
-        print("\n🔍 Testing Equipment Analysis...")
-        if agent.data['equipment']:
-            equipment_id = agent.data['equipment'][0]['ID']
-            analysis = agent.analyze_equipment_health(equipment_id)
-            print(analysis)
-        
-        print("\n" + "=" * 50)
-        
-        # Test AI chat
-        print("\n💬 Testing AI Chat...")
-        chat_responses = [
-            "How is the overall system health?",
-            "Which equipment needs immediate attention?",
-            "What are the most expensive maintenance items?",
-            "When should I schedule the next maintenance?"
-        ]
-        
-        for question in chat_responses:
-            print(f"\nQ: {question}")
-            response = agent.chat_with_ai(question)
-            print(f"A: {response}")
-        
-        print("\n✅ OpenAI AI Agent testing completed!")
+        failed = sum(not ok for ok, _ in steps)
+        if failed:
+            print(f"\n⚠️ OpenAI AI Agent testing completed with {failed} failed step(s)")
+        else:
+            print("\n✅ OpenAI AI Agent testing completed!")
         
     except Exception as e:
         print(f"❌ Error: {e}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batch", action="store_true",
+                        help="answer the chat questions through the OpenAI Batch API (cheaper, not interactive)")
+    parser.add_argument("--model", default="gpt-4o-mini",
+                        help="chat model for the test run (default: gpt-4o-mini)")
+    parser.add_argument("--all-equipment", action="store_true",
+                        help=f"analyze every equipment record, {ALL_EQUIPMENT_CONCURRENCY} at a time, instead of just the first")
+    parser.add_argument("--profile", action="store_true",
+                        help="run under cProfile and print the 30 most expensive calls by cumulative time")
+    args = parser.parse_args()
+    run = main(use_batch=args.batch, model=args.model, all_equipment=args.all_equipment)
+    
+    if args.profile:
+        import cProfile
+        import pstats
+        
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            asyncio.run(run)
+        finally:
+            profiler.disable()
+            pstats.Stats(profiler).sort_stats("cumulative").print_stats(30)
+    else:
+        asyncio.run(run)
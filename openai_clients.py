@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+OpenAI client factories shared by the agents
+Every client gets its own pooled httpx transport, using HTTP/2 when the optional h2 package is installed.
+openai and httpx are imported on first use: they dominate import time, and callers answered from caches never need them.
+"""
+
+from typing import TYPE_CHECKING, Dict, Optional
+
+if TYPE_CHECKING:
+    import httpx
+    from openai import AsyncOpenAI, OpenAI
+
+# HTTP/2 lets concurrent requests share one connection; httpx needs the optional h2 package for it
+try:
+    import h2  # noqa: F401
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
+
+# Default connection pool (keep-alive connections are reused across calls)
+DEFAULT_LIMITS = {"max_keepalive_connections": 20, "max_connections": 50}
+
+def _client_options(api_key: Optional[str], timeout: Optional[float], max_retries: Optional[int]) -> Dict:
+    """OpenAI constructor options, leaving the SDK defaults (and OPENAI_API_KEY) for anything not given"""
+    options = {}
+    if api_key is not None:
+        options["api_key"] = api_key
+    if timeout is not None:
+        options["timeout"] = timeout
+    if max_retries is not None:
+        options["max_retries"] = max_retries
+    return options
+
+def new_http_client(limits: Optional[Dict] = None, timeout: Optional[float] = None) -> "httpx.Client":
+    """Pooled sync httpx client, for OpenAI or any other API"""
+    import httpx
+
+    options = {} if timeout is None else {"timeout": timeout}
+    return httpx.Client(http2=HTTP2, limits=httpx.Limits(**(limits or DEFAULT_LIMITS)), **options)
+
+def new_openai_client(api_key: Optional[str] = None, limits: Optional[Dict] = None,
+                      timeout: Optional[float] = None, max_retries: Optional[int] = None) -> "OpenAI":
+    """OpenAI client on its own pooled transport; keep it so calls reuse keep-alive connections"""
+    from openai import OpenAI
+
+    return OpenAI(http_client=new_http_client(limits, timeout), **_client_options(api_key, timeout, max_retries))
+
+def new_async_openai_client(api_key: Optional[str] = None, limits: Optional[Dict] = None,
+                            timeout: Optional[float] = None, max_retries: Optional[int] = None) -> "AsyncOpenAI":
+    """AsyncOpenAI client for one event loop (httpx async pools cannot be shared across loops)"""
+    import httpx
+    from openai import AsyncOpenAI
+
+    options = {} if timeout is None else {"timeout": timeout}
+    http_client = httpx.AsyncClient(http2=HTTP2, limits=httpx.Limits(**(limits or DEFAULT_LIMITS)), **options)
+    return AsyncOpenAI(http_client=http_client, **_client_options(api_key, timeout, max_retries))
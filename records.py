@@ -0,0 +1,21 @@
+#!/usr/bin/env python3
+"""
+Helpers for the database records shared by the agents
+"""
+
+from typing import Dict, List
+import orjson
+
+def compact_json(obj) -> str:
+    """
+    Serialize data for prompts as compact JSON (indentation only costs tokens)
+    Keys are sorted so the same records always give the same bytes, keeping prompt prefixes cacheable.
+    """
+    return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS).decode()
+
+def first_by(items: List[Dict], key: str) -> Dict:
+    """Index records by a field, keeping the first record per value"""
+    index = {}
+    for item in items:
+        index.setdefault(item.get(key), item)
+    return index
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Semantic cache for AI responses
+Reuses a previous answer when a new query is identical, or close enough in embedding space
+"""
+
+import atexit
+import logging
+import math
+from array import array
+import os
+import pickle
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Embedding model used to compare queries
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+def normalize(vector: List[float]) -> List[float]:
+    """Scale a vector to unit length so cosine similarity is a plain dot product"""
+    norm = math.sqrt(sum(x * x for x in vector))
+    return [x / norm for x in vector] if norm else list(vector)
+
+def dot(a: Sequence[float], b: Sequence[float]) -> float:
+    """Dot product of two equal-length vectors"""
+    return math.fsum(x * y for x, y in zip(a, b))
+
+# Most inputs the embeddings endpoint accepts in one request
+EMBEDDING_BATCH_SIZE = 2048
+
+def _unit_embeddings(response) -> List[List[float]]:
+    """Unit-length embeddings from an embeddings response, in input order"""
+    # Results carry their input index; sort in case they arrive out of order
+    return [normalize(item.embedding) for item in sorted(response.data, key=lambda item: item.index)]
+
+def embed_texts(client, texts: List[str]) -> List[Optional[List[float]]]:
+    """Unit-length embeddings of texts, one request per EMBEDDING_BATCH_SIZE inputs; None where a request failed"""
+    embeddings = []
+    for start in range(0, len(texts), EMBEDDING_BATCH_SIZE):
+        chunk = texts[start:start + EMBEDDING_BATCH_SIZE]
+        try:
+            embeddings.extend(_unit_embeddings(client.embeddings.create(model=EMBEDDING_MODEL, input=chunk)))
+        except Exception as e:
+            logger.warning("⚠️ Embedding request for %d texts failed: %s", len(chunk), e)
+            embeddings.extend([None] * len(chunk))
+    return embeddings
+
+async def embed_texts_async(client, texts: List[str]) -> List[Optional[List[float]]]:
+    """Async variant of embed_texts, for an AsyncOpenAI client"""
+    embeddings = []
+    for start in range(0, len(texts), EMBEDDING_BATCH_SIZE):
+        chunk = texts[start:start + EMBEDDING_BATCH_SIZE]
+        try:
+            embeddings.extend(_unit_embeddings(await client.embeddings.create(model=EMBEDDING_MODEL, input=chunk)))
+        except Exception as e:
+            logger.warning("⚠️ Embedding request for %d texts failed: %s", len(chunk), e)
+            embeddings.extend([None] * len(chunk))
+    return embeddings
+
+_shared: Dict[str, "SemanticCache"] = {}
+_shared_lock = threading.Lock()
+
+def shared_cache(path: str = "semantic_cache.pkl") -> "SemanticCache":
+    """The process-wide cache for a file: loaded once and saved once at exit, however many agents use it"""
+    with _shared_lock:
+        cache = _shared.get(path)
+        if cache is None:
+            cache = _shared[path] = SemanticCache(path)
+            atexit.register(cache.save)
+        return cache
+
+class SemanticCache:
+    """
+    AI responses keyed by query embedding, grouped by a prompt hash
+    A cached response is only reused for the same prompt hash (same context and data).
+    Exact query matches are kept in a dict so repeated queries skip the embedding call.
+    Both are capped, evicting the least recently used answers: every lookup scans all
+    embeddings under its prompt hash, so an unbounded cache would slow down as it grows.
+    """
+
+    def __init__(self, path: str = "semantic_cache.pkl", threshold: float = 0.95, max_exact: int = 1000,
+                 max_entries: int = 500):
+        self.path = path
+        self.threshold = threshold
+        self.max_exact = max_exact
+        self.max_entries = max_entries
+        # prompt_hash -> [(unit embedding, response)]; embeddings are float32 arrays,
+        # about 6KB each for text-embedding-3-small instead of ~48KB as a list of floats.
+        # Least recently used first, both the prompt hashes and the entries under each
+        self._entries: Dict[str, List[Tuple[array, str]]] = {}
+        # (prompt_hash, query) -> response, least recently used first
+        self._exact: Dict[Tuple[str, str], str] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._entries.values())
+
+    def get_exact(self, query: str, prompt_hash: str) -> Optional[str]:
+        """Return the response cached for exactly this query, if any"""
+        key = (prompt_hash, query)
+        with self._lock:
+            response = self._exact.pop(key, None)
+            if response is not None:
+                self._exact[key] = response  # mark as most recently used
+        return response
+    
+    def add_exact(self, query: str, response: str, prompt_hash: str):
+        """Store a response under its exact query text"""
+        with self._lock:
+            self._exact.pop((prompt_hash, query), None)
+            self._exact[(prompt_hash, query)] = response
+            while len(self._exact) > self.max_exact:
+                del self._exact[next(iter(self._exact))]
+    
+    def lookup(self, embedding: List[float], prompt_hash: str) -> Optional[str]:
+        """Return the most similar cached response at or above the threshold, if any"""
+        best_score, best_index = self.threshold, None
+        with self._lock:
+            entries = self._entries.get(prompt_hash, ())
+            for i, (cached_embedding, _) in enumerate(entries):
+                score = dot(embedding, cached_embedding)
+                if score >= best_score:
+                    best_score, best_index = score, i
+            if best_index is None:
+                return None
+            # Mark the hit (and its prompt hash) as most recently used
+            entry = entries.pop(best_index)
+            entries.append(entry)
+            self._entries[prompt_hash] = self._entries.pop(prompt_hash)
+        return entry[1]
+
+    def add(self, embedding: List[float], response: str, prompt_hash: str):
+        """Store a response under its unit-length query embedding"""
+        with self._lock:
+            entries = self._entries.pop(prompt_hash, [])
+            entries.append((array('f', embedding), response))
+            self._entries[prompt_hash] = entries
+            self._evict()
+    
+    def _evict(self):
+        """Drop least recently used entries beyond max_entries, oldest prompt hash first (lock held)"""
+        excess = len(self) - self.max_entries
+        while excess > 0:
+            prompt_hash = next(iter(self._entries))
+            entries = self._entries[prompt_hash]
+            dropped = min(excess, len(entries))
+            del entries[:dropped]
+            excess -= dropped
+            if not entries:
+                del self._entries[prompt_hash]
+
+    def clear(self):
+        """Forget every cached response (the file is rewritten on the next save)"""
+        with self._lock:
+            self._entries.clear()
+            self._exact.clear()
+
+    def save(self):
+        """Write the cache to disk"""
+        with self._lock:
+            try:
+                with open(self.path, 'wb') as f:
+                    pickle.dump((self._entries, self._exact), f, protocol=pickle.HIGHEST_PROTOCOL)
+            except Exception as e:
+                logger.error("❌ Error saving semantic cache: %s", e)
+
+    def _load(self):
+        """Load a previously saved cache, if present"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'rb') as f:
+                state = pickle.load(f)
+            # Caches saved before exact matching was added hold only the semantic entries
+            if isinstance(state, dict):
+                self._entries = state
+            else:
+                self._entries, self._exact = state
+            # Older caches stored embeddings as lists of floats
+            for entries in self._entries.values():
+                entries[:] = [(array('f', embedding), response) for embedding, response in entries]
+            self._evict()
+            logger.info("✅ Loaded semantic cache: %s responses", len(self))
+        except Exception as e:
+            logger.error("❌ Error loading semantic cache: %s", e)
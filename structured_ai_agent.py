@@ -1,15 +1,31 @@
-import json
-import openai
+import argparse
+import asyncio
+import hashlib
+import mmap
+import orjson
 import os
+import sqlite3
+import sys
+import threading
+import time
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Dict, List, Mapping, Optional, Any
 import logging
 from dotenv import load_dotenv
-import dateutil.parser
 from collections import defaultdict
-import requests
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property, lru_cache
 import re
 from ai_lifespan_lookup import AILifespanLookup
+from records import compact_json, first_by
+from semantic_cache import embed_texts, shared_cache
+from openai_clients import new_async_openai_client, new_openai_client
+
+# openai/httpx and dateutil are imported where first needed, keeping CLI startup fast
+# (commands answered from local data or caches never load them)
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI, OpenAI
 
 load_dotenv()
 
@@ -17,6 +33,94 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Chat settings shared by the sync and async structured requests
+_STRUCTURED_SYSTEM_MESSAGE = "You are an expert maintenance AI analyst. Always respond with valid JSON only."
+_STRUCTURED_PARAMS = {
+    "model": "gpt-3.5-turbo",
+    "temperature": 0.0,
+    # JSON mode: the API only returns syntactically valid JSON objects
+    "response_format": {"type": "json_object"}
+}
+
+# Output token cap for structured answers. Even the metrics and costs schemas hold lists, maps and
+# free-text fields, so every endpoint gets the same headroom: JSON cut off at the cap can't be used
+_STRUCTURED_MAX_TOKENS = 1000
+
+# Outermost {...} in an answer wrapped in prose or a code fence
+_JSON_OBJECT_RE = re.compile(r"\{.*\}", re.DOTALL)
+
+@lru_cache(maxsize=4096)
+def _parse_date(value: str) -> datetime:
+    """
+    Parse a date string into a timezone-naive datetime
+    ISO 8601 (what the database stores) takes the fast path; anything else goes
+    through dateutil's fuzzy parser. Dates repeat across records, so results are memoized.
+    """
+    try:
+        dt = datetime.fromisoformat(value)
+    except ValueError:
+        import dateutil.parser
+        dt = dateutil.parser.parse(value, fuzzy=True)
+    return dt.replace(tzinfo=None)
+
+def _online_lifespan_key(part_name: str, machine_name: str, manufacturer: str = None) -> tuple:
+    """Normalized (part_name, manufacturer, machine_name) key of the online lifespan caches"""
+    return (part_name.lower().strip(), manufacturer or '', machine_name or '')
+
+# Model for the online lifespan lookups
+_LIFESPAN_MODEL = "gpt-4o-mini"
+
+# Online lifespan lookups: everything static is in the system message, identical on every
+# call so it is a cacheable prefix; the user message only carries the part(s) as JSON
+_LIFESPAN_SYSTEM_MESSAGE = {"role": "system", "content": """You are a maintenance expert with deep knowledge of industrial equipment, manufacturer specifications, and maintenance standards. Provide accurate lifespan estimates based on real-world experience and manufacturer data.
+
+Each request is one part as a JSON object {"part", "machine", "manufacturer"}, or a JSON array of such objects, each with its index "i".
+
+Based on your knowledge of maintenance standards and manufacturer specifications, provide for each part:
+
+1. The typical lifespan in months for this specific part
+2. Consider the manufacturer's recommended maintenance intervals
+3. Account for the specific machine/equipment type
+4. Use industry standards for similar parts if manufacturer data isn't available
+
+Examples of typical lifespans:
+- Air filters: 3-12 months
+- Oil filters: 3-6 months
+- Belts: 12-24 months
+- Bearings: 24-60 months
+- Electronic components: 12-36 months
+- Seals/gaskets: 12-24 months
+- Sensors: 24-48 months
+- Motors: 36-72 months
+
+Respond with ONLY a JSON object:
+- for one part: {"months": <lifespan in months>}, with null for months if you cannot determine it
+- for an array of parts: {"results": [{"i": <index>, "months": <lifespan in months>}, ...]} with one entry per part, using null for months you cannot determine"""}
+
+# Several parts per lifespan request, so the system message is paid for once per batch
+_LIFESPAN_BATCH_SIZE = 50
+
+# Online lifespans are also reused for near-identical part descriptions ("Oil Filter A200" vs
+# "oil filter a-200"); answers are only shared while the model and instructions are unchanged
+_LIFESPAN_SEMANTIC_CACHE_PATH = 'lifespan_semantic_cache.pkl'
+_LIFESPAN_PROMPT_HASH = hashlib.sha256(f"{_LIFESPAN_MODEL}\n{_LIFESPAN_SYSTEM_MESSAGE['content']}".encode("utf-8")).hexdigest()
+
+# Database file, and its parsed sections keyed by (path, mtime, size) so agents
+# created while the file is unchanged share one parse instead of re-reading it
+_DB_PATH = 'json/db2.json'
+_DB_CACHE: Dict[tuple, Mapping[str, List[Dict]]] = {}
+
+# Cached properties computed from the loaded data (see _rebuild_indices)
+_DATA_DERIVED_PROPERTIES = ('_machines_by_rollingstock', '_parts_by_id', '_prompt_header', '_system_prompt', '_replacement_dates')
+
+# Online lifespan answers persist across runs (and API workers) in SQLite, and are re-fetched after the TTL
+_LIFESPAN_DB_PATH = 'lifespan_cache.sqlite'
+_LIFESPAN_TTL_SECONDS = 30 * 24 * 3600
+# Most online lifespan searches in flight at once
+_ONLINE_LOOKUP_WORKERS = 16
+# Seconds the startup warm-up request may take, so a slow network can't hold up the first command for long
+_WARMUP_TIMEOUT = 5
+
 # Add default lifespans for parts (fallback only)
 DEFAULT_PART_LIFESPANS = {
     3: 12,   # 1 year default
@@ -46,7 +150,6 @@ class StructuredSparePartsAgent:
         default_key = os.getenv("OPENAI_API_KEY", "")
         self.api_key = default_key
         if self.api_key:
-            openai.api_key = self.api_key
             self.use_openai = True
         else:
             self.use_openai = False
@@ -55,18 +158,42 @@ class StructuredSparePartsAgent:
         # Initialize AI lifespan lookup
         self.ai_lifespan_lookup = AILifespanLookup()
         
+        # Structured answers by (query, response_format, max_tokens), as JSON bytes so every caller gets
+        # its own copy, each with the data it was asked about. The prompt is built from the data alone,
+        # so an answer holds until the data file changes (checked per request, see _refresh_data) and
+        # repeated dashboard polls reuse it
+        self._structured_answers: Dict[tuple, tuple] = {}
+        
+        # Smart lifespans in months by part ID; part IDs repeat across many spare-parts rows
+        self._lifespan_by_part: Dict[Any, int] = {}
+        
+        # Online lifespans by normalized (part_name, manufacturer, machine_name), in front of the SQLite cache
+        self._online_lifespans: Dict[tuple, int] = {}
+        self._online_lifespans_lock = threading.Lock()
+        # Guards the SQLite connection, which is opened on first use
+        self._lifespan_db_lock = threading.Lock()
+        # Online lifespans by part description embedding, for near-identical parts; saved on exit
+        self._semantic_lifespans = shared_cache(_LIFESPAN_SEMANTIC_CACHE_PATH)
+        
         # Load data
         self.data = self._load_all_data()
         logger.info("🤖 Structured AI Agent initialized successfully")
     
-    def _load_all_data(self) -> Dict:
+    def _load_all_data(self) -> Mapping[str, List[Dict]]:
         """Load all data from db.json"""
         data = {}
         
         try:
-            # Load all data from db.json
-            with open('json/db2.json', 'r') as f:
-                db_data = json.load(f)
+            stat = os.stat(_DB_PATH)
+            key = (_DB_PATH, stat.st_mtime_ns, stat.st_size)
+            if key in _DB_CACHE:
+                return _DB_CACHE[key]
+            
+            # Load all data from db.json, parsing straight from the mapped file instead of
+            # reading a private copy of its bytes first
+            with open(_DB_PATH, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                with memoryview(mm) as view:
+                    db_data = orjson.loads(view)
             
             # Map db.json structure to expected format
             data['equipment'] = db_data.get('rollingstock', [])
@@ -80,16 +207,69 @@ class StructuredSparePartsAgent:
             data['maintenance_schedules'] = db_data.get('maintenanceSchedules', [])
             data['machine_producers'] = db_data.get('machineProducers', [])
             
-            logger.info(f"✅ Loaded data from db.json: {len(data['machines'])} machines, {len(data['equipment'])} equipment, {len(data['spare_parts'])} parts, {len(data['activities'])} activities")
+            logger.info("✅ Loaded data from db.json: %s machines, %s equipment, %s parts, %s activities", len(data['machines']), len(data['equipment']), len(data['spare_parts']), len(data['activities']))
+            
+            # Read-only view: agents share this parse (and their cached prompt header and
+            # indexes assume it never changes), so replacing a section is an error
+            data = MappingProxyType(data)
+            
+            # Only the current version of the file is worth keeping
+            _DB_CACHE.clear()
+            _DB_CACHE[key] = data
             
         except Exception as e:
-            logger.error(f"❌ Error loading data from db.json: {e}")
+            logger.error("❌ Error loading data from db.json: %s", e)
             raise
         
         return data
     
-    def _create_structured_prompt(self, query: str, response_format: str) -> str:
-        """Create a prompt that requests structured JSON response"""
+    def reload_data(self) -> bool:
+        """
+        Pick up changes to db.json, rebuilding the indexes over the data if it changed
+        Returns True if new data was loaded
+        """
+        data = self._load_all_data()
+        if data is self.data:
+            return False
+        self.data = data
+        self._rebuild_indices()
+        return True
+    
+    def _refresh_data(self):
+        """reload_data for every request: one stat of the data file, keeping the current data if it can't be read"""
+        try:
+            self.reload_data()
+        except Exception:
+            pass  # already logged by _load_all_data
+    
+    def _rebuild_indices(self):
+        """Drop everything derived from self.data, so it is rebuilt from the current data on next use"""
+        for name in _DATA_DERIVED_PROPERTIES:
+            self.__dict__.pop(name, None)
+        self._lifespan_by_part.clear()
+        self._structured_answers.clear()
+    
+    @cached_property
+    def client(self) -> "OpenAI":
+        """OpenAI client, created on first use and kept so calls reuse pooled keep-alive connections"""
+        return new_openai_client(self.api_key)
+    
+    def new_async_client(self) -> "AsyncOpenAI":
+        """AsyncOpenAI client for the calling event loop"""
+        return new_async_openai_client(self.api_key)
+    
+    # Lookup indexes over the loaded data, built on first use
+    @cached_property
+    def _machines_by_rollingstock(self) -> Dict:
+        return first_by(self.data['machines'], 'rollingstockId')
+    
+    @cached_property
+    def _parts_by_id(self) -> Dict:
+        return first_by(self.data['spare_parts'], 'SPAREPARTID')
+    
+    @cached_property
+    def _prompt_header(self) -> str:
+        """Data summary and sample block shared by every structured prompt, built once per agent"""
         
         # Calculate comprehensive stats
         machines_count = len(self.data['machines'])
@@ -108,9 +288,8 @@ class StructuredSparePartsAgent:
         sample_equipment = self.data['equipment'][:2]
         sample_parts = self.data['spare_parts'][:3]
         sample_activities = self.data['activities'][:3]
-        sample_schedules = self.data['maintenance_schedules'][:2]
         
-        prompt = f"""
+        return f"""
 You are an expert AI maintenance analyst. Analyze the following comprehensive maintenance data and provide a structured response.
 
 COMPREHENSIVE DATA SUMMARY:
@@ -126,54 +305,157 @@ COMPREHENSIVE DATA SUMMARY:
 - Total Cost: ${total_cost:,.2f}
 
 SAMPLE DATA:
-Machines: {json.dumps(sample_machines, indent=2)}
-Equipment: {json.dumps(sample_equipment, indent=2)}
-Parts: {json.dumps(sample_parts, indent=2)}
-Activities: {json.dumps(sample_activities, indent=2)}
-
-QUERY: {query}
+Machines: {compact_json(sample_machines)}
+Equipment: {compact_json(sample_equipment)}
+Parts: {compact_json(sample_parts)}
+Activities: {compact_json(sample_activities)}
+"""
+    
+    @cached_property
+    def _system_prompt(self) -> str:
+        """Static instructions and data block; one identical string on every request so OpenAI caches it"""
+        return f"{_STRUCTURED_SYSTEM_MESSAGE}\n{self._prompt_header}"
+    
+    def _create_structured_prompt(self, query: str, response_format: str) -> str:
+        """Create the per-request part of the prompt, asking for a structured JSON response"""
+        return f"""QUERY: {query}
 
 RESPONSE FORMAT: {response_format}
 
 IMPORTANT: Respond ONLY with valid JSON in the exact format specified. Do not include any text before or after the JSON.
 """
-        return prompt
     
-    def ask_ai_structured(self, query: str, response_format: str) -> Dict[str, Any]:
-        """Ask OpenAI for structured analysis"""
+    def _create_messages(self, query: str, response_format: str) -> List[Dict]:
+        """Build the chat messages for a structured request"""
+        # Everything that never changes sits in the system message, so the long data block is a cacheable prefix
+        return [
+            {"role": "system", "content": self._system_prompt},
+            {"role": "user", "content": self._create_structured_prompt(query, response_format)}
+        ]
+    
+    def _parse_structured(self, response_text: str) -> Optional[Dict[str, Any]]:
+        """
+        Parse a structured JSON answer, or None when it isn't valid JSON
+        Tries strict JSON, then the {...} object inside surrounding text.
+        """
+        try:
+            return orjson.loads(response_text)
+        except orjson.JSONDecodeError:
+            pass
+        
+        match = _JSON_OBJECT_RE.search(response_text)
+        if match:
+            try:
+                return orjson.loads(match.group(0))
+            except orjson.JSONDecodeError:
+                pass
+        
+        logger.error("Invalid JSON response: %s", response_text)
+        return None
+    
+    def _remember_structured(self, key: tuple, response, data: Mapping[str, List[Dict]]) -> Dict[str, Any]:
+        """Parse a structured answer and keep it for the data it was asked about; fallbacks are not kept"""
+        choice = response.choices[0]
+        if choice.finish_reason == "length":
+            # JSON mode stops mid-object at the token cap; that's a budget problem, not bad JSON
+            logger.error("✂️ Structured answer cut off at max_tokens=%s: %s", key[2], key[0])
+            return self._fallback_structured_response(key[0], "Answer exceeded the output token limit")
+        
+        answer = self._parse_structured(choice.message.content.strip())
+        if answer is None:
+            return self._fallback_structured_response(key[0])
+        # A request that started before a reload still stores its answer, but tagged with the old
+        # data, so it's never served for the new data
+        self._structured_answers[key] = (data, orjson.dumps(answer))
+        return answer
+    
+    def _structured_answer(self, key: tuple) -> Optional[Dict[str, Any]]:
+        """A copy of the answer kept for this request, if the data file hasn't changed since"""
+        self._refresh_data()
+        entry = self._structured_answers.get(key)
+        if entry is None or entry[0] is not self.data:
+            return None
+        return orjson.loads(entry[1])
+    
+    def ask_ai_structured(self, query: str, response_format: str, max_tokens: int = _STRUCTURED_MAX_TOKENS) -> Dict[str, Any]:
+        """Ask OpenAI for structured analysis, reusing the answer while the data is unchanged"""
         if not self.use_openai:
             return self._fallback_structured_response(query)
         
+        key = (query, response_format, max_tokens)
+        answer = self._structured_answer(key)
+        if answer is not None:
+            return answer
+        data = self.data
+        
         try:
-            prompt = self._create_structured_prompt(query, response_format)
-            
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are an expert maintenance AI analyst. Always respond with valid JSON only."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.0,
-                max_tokens=1000
+            response = self.client.chat.completions.create(
+                messages=self._create_messages(query, response_format),
+                max_tokens=max_tokens,
+                **_STRUCTURED_PARAMS
             )
             
-            response_text = response.choices[0].message.content.strip()
+            details = response.usage and response.usage.prompt_tokens_details
+            if details and details.cached_tokens:
+                logger.info("📊 %s of %s prompt tokens served from cache", details.cached_tokens, response.usage.prompt_tokens)
             
-            # Try to parse JSON response
-            try:
-                return json.loads(response_text)
-            except json.JSONDecodeError:
-                logger.error(f"Invalid JSON response: {response_text}")
-                return self._fallback_structured_response(query)
+            return self._remember_structured(key, response, data)
             
         except Exception as e:
-            logger.error(f"OpenAI API error: {e}")
+            logger.error("OpenAI API error: %s", e)
             return self._fallback_structured_response(query)
     
-    def _fallback_structured_response(self, query: str) -> Dict[str, Any]:
-        """Fallback structured response when OpenAI is not available"""
+    async def ask_ai_structured_async(self, query: str, response_format: str, client: Optional["AsyncOpenAI"] = None,
+                                      max_tokens: int = _STRUCTURED_MAX_TOKENS) -> Dict[str, Any]:
+        """
+        Async variant of ask_ai_structured, so several structured queries can run concurrently
+        Pass an AsyncOpenAI client to share one connection pool across requests.
+        """
+        if not self.use_openai:
+            return self._fallback_structured_response(query)
+        
+        key = (query, response_format, max_tokens)
+        answer = self._structured_answer(key)
+        if answer is not None:
+            return answer
+        data = self.data
+        
+        if client is None:
+            async with self.new_async_client() as client:
+                return await self.ask_ai_structured_async(query, response_format, client, max_tokens)
+        
+        try:
+            response = await client.chat.completions.create(
+                messages=self._create_messages(query, response_format),
+                max_tokens=max_tokens,
+                **_STRUCTURED_PARAMS
+            )
+            return self._remember_structured(key, response, data)
+            
+        except Exception as e:
+            logger.error("OpenAI API error: %s", e)
+            return self._fallback_structured_response(query)
+    
+    def ask_ai_structured_many(self, requests: List[tuple]) -> List[Dict[str, Any]]:
+        """
+        Run several (query, response_format, max_tokens) requests concurrently over one client
+        Returns the structured answers in request order
+        """
+        async def run() -> List[Dict[str, Any]]:
+            if not self.use_openai:
+                return [self._fallback_structured_response(query) for query, _, _ in requests]
+            async with self.new_async_client() as client:
+                return await asyncio.gather(*(
+                    self.ask_ai_structured_async(query, response_format, client, max_tokens)
+                    for query, response_format, max_tokens in requests
+                ))
+        
+        return asyncio.run(run())
+    
+    def _fallback_structured_response(self, query: str, error: str = "OpenAI API not available") -> Dict[str, Any]:
+        """Fallback structured response when OpenAI is not available or gave no usable answer"""
         return {
-            "error": "OpenAI API not available",
+            "error": error,
             "message": f"Query: {query}",
             "data": {},
             "timestamp": datetime.now().isoformat()
@@ -181,6 +463,10 @@ IMPORTANT: Respond ONLY with valid JSON in the exact format specified. Do not in
     
     def get_dashboard_metrics(self) -> Dict[str, Any]:
         """Get structured dashboard metrics"""
+        return self.ask_ai_structured(*self._metrics_request())
+    
+    def _metrics_request(self) -> tuple:
+        """(query, response_format, max_tokens) for the dashboard metrics"""
         response_format = """
 {
   "total_machines": number,
@@ -221,10 +507,14 @@ IMPORTANT: Respond ONLY with valid JSON in the exact format specified. Do not in
         
         query = "Analyze the comprehensive maintenance data and provide dashboard metrics including machine counts, costs, health scores, maintenance schedules, and key performance indicators. Consider all data types: machines, equipment, parts, activities, contracts, movements, and schedules."
         
-        return self.ask_ai_structured(query, response_format)
+        return query, response_format, _STRUCTURED_MAX_TOKENS
     
     def get_maintenance_alerts(self) -> Dict[str, Any]:
         """Get structured maintenance alerts"""
+        return self.ask_ai_structured(*self._alerts_request())
+    
+    def _alerts_request(self) -> tuple:
+        """(query, response_format, max_tokens) for the maintenance alerts"""
         response_format = """
 {
   "urgent_alerts": [
@@ -294,7 +584,7 @@ IMPORTANT: Respond ONLY with valid JSON in the exact format specified. Do not in
         
         query = "Analyze the comprehensive maintenance data and generate structured alerts. Include urgent equipment issues, upcoming scheduled maintenance, parts needing replacement, equipment health concerns, and cost alerts. Consider all data types: machines, equipment, parts, activities, contracts, movements, and schedules."
         
-        return self.ask_ai_structured(query, response_format)
+        return query, response_format, _STRUCTURED_MAX_TOKENS
     
     def get_equipment_analysis(self, equipment_id: int) -> Dict[str, Any]:
         """Get structured equipment analysis"""
@@ -340,6 +630,10 @@ IMPORTANT: Respond ONLY with valid JSON in the exact format specified. Do not in
     
     def get_cost_analysis(self) -> Dict[str, Any]:
         """Get structured cost analysis"""
+        return self.ask_ai_structured(*self._costs_request())
+    
+    def _costs_request(self) -> tuple:
+        """(query, response_format, max_tokens) for the cost analysis"""
         response_format = """
 {
   "total_cost": number,
@@ -376,10 +670,14 @@ IMPORTANT: Respond ONLY with valid JSON in the exact format specified. Do not in
         
         query = "Analyze maintenance costs, identify trends, expensive items, and optimization opportunities."
         
-        return self.ask_ai_structured(query, response_format)
+        return query, response_format, _STRUCTURED_MAX_TOKENS
     
     def get_predictions(self) -> Dict[str, Any]:
         """Get structured predictions"""
+        return self.ask_ai_structured(*self._predictions_request())
+    
+    def _predictions_request(self) -> tuple:
+        """(query, response_format, max_tokens) for the predictions"""
         response_format = """
 {
   "part_replacements": [
@@ -423,7 +721,18 @@ IMPORTANT: Respond ONLY with valid JSON in the exact format specified. Do not in
         
         query = "Predict part replacements, equipment failures, maintenance schedules, and inventory needs based on historical data."
         
-        return self.ask_ai_structured(query, response_format)
+        return query, response_format, _STRUCTURED_MAX_TOKENS
+    
+    def get_dashboard_overview(self) -> Dict[str, Any]:
+        """Metrics, alerts, cost analysis and predictions, requested concurrently"""
+        names = ("metrics", "alerts", "costs", "predictions")
+        answers = self.ask_ai_structured_many([
+            self._metrics_request(),
+            self._alerts_request(),
+            self._costs_request(),
+            self._predictions_request()
+        ])
+        return dict(zip(names, answers))
 
     def get_machine_analysis(self, machine_id: str) -> Dict[str, Any]:
         """Get structured analysis for a specific machine"""
@@ -482,11 +791,10 @@ IMPORTANT: Respond ONLY with valid JSON in the exact format specified. Do not in
         
         return self.ask_ai_structured(query, response_format)
 
-    def _calculate_part_lifespans_from_data(self) -> Dict[int, float]:
-        """Calculate average lifespan (in days) for each part type from historical data."""
-        part_intervals = defaultdict(list)
-        
-        # Group all replacements by part type
+    @cached_property
+    def _replacement_dates(self) -> Dict[tuple, List[datetime]]:
+        """Sorted replacement dates per (equipment, part), parsed once and shared by the prediction methods"""
+        replacements = defaultdict(list)
         for part in self.data['spare_parts']:
             part_id = part.get('SPAREPARTID')
             equip_id = part.get('ROLLINGSTOCKID')
@@ -497,85 +805,60 @@ IMPORTANT: Respond ONLY with valid JSON in the exact format specified. Do not in
                 continue
             if replace_date and replace_date != "NULL":
                 try:
-                    dt = dateutil.parser.parse(replace_date, fuzzy=True)
-                    part_intervals[part_id].append((equip_id, dt))
-                except Exception:
+                    # Stored timezone-naive, so every comparison downstream is naive vs. naive
+                    replacements[(equip_id, part_id)].append(_parse_date(replace_date))
+                except Exception as e:
+                    logger.debug("Failed to parse date '%s' for part %s on equipment %s: %s", replace_date, part_id, equip_id, e)
                     continue
         
-        # Calculate average interval for each part type
-        part_lifespans = {}
-        for part_id, replacements in part_intervals.items():
-            # Group by equipment to find intervals for each equipment
-            equip_replacements = defaultdict(list)
-            for equip_id, dt in replacements:
-                equip_replacements[equip_id].append(dt)
-            
-            # Calculate intervals for each equipment
-            all_intervals = []
-            for equip_id, dates in equip_replacements.items():
-                if len(dates) >= 2:
-                    dates.sort()
-                    intervals = [(dates[i] - dates[i-1]).days for i in range(1, len(dates))]
-                    all_intervals.extend(intervals)
-            
-            # Calculate average interval for this part type
-            if all_intervals:
-                avg_interval = sum(all_intervals) / len(all_intervals)
-                part_lifespans[part_id] = avg_interval
-                print(f"[DEBUG] Part {part_id}: average lifespan = {avg_interval:.1f} days ({avg_interval/365:.1f} years)")
+        for dates in replacements.values():
+            dates.sort()
+        return dict(replacements)
+    
+    def _calculate_part_lifespans_from_data(self) -> Dict[int, float]:
+        """Calculate average lifespan (in days) for each part type from historical data."""
+        # Sum the intervals between consecutive replacements on the same equipment, per part type
+        interval_totals = defaultdict(lambda: [0, 0])
+        for (_, part_id), dates in self._replacement_dates.items():
+            if len(dates) < 2:
+                continue
+            totals = interval_totals[part_id]
+            totals[0] += sum((later - earlier).days for earlier, later in zip(dates, dates[1:]))
+            totals[1] += len(dates) - 1
+        
+        part_lifespans = {part_id: total / count for part_id, (total, count) in interval_totals.items()}
+        for part_id, avg_interval in part_lifespans.items():
+            logger.debug("Part %s: average lifespan = %.1f days (%.1f years)", part_id, avg_interval, avg_interval/365)
         
         return part_lifespans
     
     def predict_part_replacements(self) -> list:
         """Predict next replacement date for each (equipment, part) pair based on historical intervals."""
+        self._refresh_data()
         # First, calculate average lifespans from data
         part_lifespans = self._calculate_part_lifespans_from_data()
         
-        # Group replacement dates by (equipment, part)
-        replacements = defaultdict(list)
-        total_parts = 0
-        valid_dates = 0
-        
-        for part in self.data['spare_parts']:
-            part_id = part.get('SPAREPARTID')
-            equip_id = part.get('ROLLINGSTOCKID')
-            replace_date = part.get('REPLACEDATE')
-            total_parts += 1
-            # Accept string or int IDs, only skip if None
-            if part_id is None or equip_id is None:
-                continue
-            if replace_date and replace_date != "NULL":
-                try:
-                    dt = dateutil.parser.parse(replace_date, fuzzy=True)
-                    replacements[(equip_id, part_id)].append(dt)
-                    valid_dates += 1
-                except Exception as e:
-                    print(f"[DEBUG] Failed to parse date '{replace_date}' for part {part_id} on equipment {equip_id}: {e}")
-                    continue
+        # Replacement dates by (equipment, part), already parsed and sorted
+        replacements = self._replacement_dates
         
-        print(f"[DEBUG] Total parts processed: {total_parts}")
-        print(f"[DEBUG] Valid dates found: {valid_dates}")
-        print(f"[DEBUG] Unique (equipment, part) pairs: {len(replacements)}")
+        # Look up the lifespans of all parts at once rather than one by one in the loop
+        lifespans = self.get_smart_part_lifespans([part_id for _, part_id in replacements])
         
-        # Count pairs with different numbers of replacements
-        pairs_with_1 = sum(1 for v in replacements.values() if len(v) == 1)
-        pairs_with_2_plus = sum(1 for v in replacements.values() if len(v) >= 2)
-        print(f"[DEBUG] Pairs with 1 replacement: {pairs_with_1}")
-        print(f"[DEBUG] Pairs with 2+ replacements: {pairs_with_2_plus}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Total parts processed: %s", len(self.data['spare_parts']))
+            logger.debug("Valid dates found: %s", sum(len(dates) for dates in replacements.values()))
+            logger.debug("Unique (equipment, part) pairs: %s", len(replacements))
+            # Count pairs with different numbers of replacements
+            logger.debug("Pairs with 1 replacement: %s", sum(1 for v in replacements.values() if len(v) == 1))
+            logger.debug("Pairs with 2+ replacements: %s", sum(1 for v in replacements.values() if len(v) >= 2))
         
         predictions = []
+        # Naive, like the parsed replacement dates
         now = datetime.now()
         
         for (equip_id, part_id), dates in replacements.items():
-            dates.sort()
             last_replacement = dates[-1]
             
-            # Ensure timezone-naive comparison
-            if last_replacement.tzinfo is not None:
-                last_replacement = last_replacement.replace(tzinfo=None)
-            if now.tzinfo is not None:
-                now = now.replace(tzinfo=None)
-            
             if len(dates) >= 2:
                 # Calculate average interval from historical data for this specific equipment
                 intervals = [(dates[i] - dates[i-1]).days for i in range(1, len(dates))]
@@ -590,10 +873,10 @@ IMPORTANT: Respond ONLY with valid JSON in the exact format specified. Do not in
             due = now >= predicted_next
 
             # Get AI-powered lifespan in months for this part
-            lifespan_months = self.get_smart_part_lifespan(part_id)
+            lifespan_months = lifespans[part_id]
 
             # Gather machine data
-            machine = next((m for m in self.data['machines'] if m.get('rollingstockId') == equip_id), None)
+            machine = self._machines_by_rollingstock.get(equip_id)
             machine_data = {
                 'machine_id': machine.get('id') if machine else None,
                 'machine_name': machine.get('name') if machine else None,
@@ -603,7 +886,7 @@ IMPORTANT: Respond ONLY with valid JSON in the exact format specified. Do not in
             } if machine else {}
 
             # Gather part data
-            part = next((p for p in self.data['spare_parts'] if p.get('SPAREPARTID') == part_id), None)
+            part = self._parts_by_id.get(part_id)
             part_data = {
                 'part_name': part.get('NOTE') if part else None,
                 'description': part.get('DESCRIPTION') if part else None,
@@ -627,44 +910,45 @@ IMPORTANT: Respond ONLY with valid JSON in the exact format specified. Do not in
 
     def get_due_part_checks(self) -> list:
         """Return a list of parts on equipment that are due for check/replacement based on lifespan."""
+        self._refresh_data()
         due_checks = []
-        now = datetime.now()
+        # Naive, like _parse_date's results; due means the expected check day has come
+        today = datetime.now().date()
+        # One pass over the parts keeps the rows that can be due: valid integer IDs and a replacement date
+        dated = []
         for part in self.data['spare_parts']:
             part_id = part.get('SPAREPARTID')
             equip_id = part.get('ROLLINGSTOCKID')
             replace_date = part.get('REPLACEDATE')
-            if not (isinstance(part_id, int) and isinstance(equip_id, int)):
-                continue  # skip if IDs are not valid integers
-            
-            lifespan_months = self.get_smart_part_lifespan(part_id)
-            if replace_date and replace_date != "NULL" and lifespan_months:
-                try:
-                    dt = dateutil.parser.parse(replace_date, fuzzy=True) # Use dateutil.parser.parse
-                    # Ensure both dates are timezone-naive for comparison
-                    if dt.tzinfo is not None:
-                        dt = dt.replace(tzinfo=None)
-                    if now.tzinfo is not None:
-                        now = now.replace(tzinfo=None)
-                    next_check = dt + timedelta(days=lifespan_months*30)
-                    expected_next_check = next_check.strftime("%Y-%m-%d")
-                except Exception as e:
-                    print(f"[DEBUG] Failed to parse date '{replace_date}' for part {part_id}: {e}")
-                    expected_next_check = "N/A"
-            else:
-                expected_next_check = "N/A"
-            
-            # Use smart lifespan source info
-            lifespan_source = "online" if self.get_online_part_lifespan(part_id) else "default"
+            if isinstance(part_id, int) and isinstance(equip_id, int) and replace_date and replace_date != "NULL":
+                dated.append((part_id, equip_id, replace_date))
+        
+        # Look up the lifespans of those parts at once rather than one by one in the loop
+        lifespans = self.get_smart_part_lifespans([part_id for part_id, _, _ in dated])
+        for part_id, equip_id, replace_date in dated:
+            lifespan_months = lifespans[part_id]
+            if not lifespan_months:
+                continue
+            try:
+                next_check = _parse_date(replace_date) + timedelta(days=lifespan_months*30)
+            except Exception as e:
+                logger.debug("Failed to parse date '%s' for part %s: %s", replace_date, part_id, e)
+                continue
             
-            if expected_next_check != "N/A" and now >= dateutil.parser.parse(expected_next_check, fuzzy=True):
+            if today >= next_check.date():
                 due_checks.append({
                     "equipment_id": equip_id,
                     "part_id": part_id,
                     "last_replacement": replace_date,
-                    "expected_next_check": expected_next_check,
-                    "lifespan_months": lifespan_months,
-                    "lifespan_source": lifespan_source
+                    "expected_next_check": next_check.strftime("%Y-%m-%d"),
+                    "lifespan_months": lifespan_months
                 })
+        
+        # Online lookups are made only for the parts that turned out to be due, all at once
+        online_lifespans = self._prefetch_online_lifespans(check["part_id"] for check in due_checks)
+        for check in due_checks:
+            # Use smart lifespan source info
+            check["lifespan_source"] = "online" if online_lifespans[check["part_id"]] else "default"
         return due_checks
 
     def _search_part_lifespan_openai_only(self, part_name: str, machine_name: str, manufacturer: str = None) -> Optional[int]:
@@ -673,103 +957,332 @@ IMPORTANT: Respond ONLY with valid JSON in the exact format specified. Do not in
         Returns lifespan in months, or None if not found
         """
         try:
-            # Create a more sophisticated search query
-            search_terms = [
-                f"{part_name} lifespan",
-                f"{part_name} replacement interval",
-                f"{part_name} maintenance schedule",
-                f"{machine_name} {part_name} lifespan",
-                f"{manufacturer} {part_name} maintenance"
-            ]
-            
-            # Use OpenAI to search and analyze online information with better prompting
-            prompt = f"""
-You are a maintenance expert with access to manufacturer specifications and industry databases.
-
-SEARCH QUERY: Find the typical lifespan for this part:
-
-Part Name: {part_name}
-Machine/Equipment: {machine_name}
-Manufacturer: {manufacturer or 'Unknown'}
-
-Search Terms: {', '.join(search_terms)}
-
-Based on your knowledge of maintenance standards and manufacturer specifications, provide:
-
-1. The typical lifespan in months for this specific part
-2. Consider the manufacturer's recommended maintenance intervals
-3. Account for the specific machine/equipment type
-4. Use industry standards for similar parts if manufacturer data isn't available
-
-Examples of typical lifespans:
-- Air filters: 3-12 months
-- Oil filters: 3-6 months  
-- Belts: 12-24 months
-- Bearings: 24-60 months
-- Electronic components: 12-36 months
-- Seals/gaskets: 12-24 months
-- Sensors: 24-48 months
-- Motors: 36-72 months
-
-Respond with ONLY a number representing the lifespan in months, or 'UNKNOWN' if you cannot determine it.
-"""
+            # Use OpenAI to analyze the part; the instructions are all in the system message
+            prompt = compact_json({"part": part_name, "machine": machine_name, "manufacturer": manufacturer or 'Unknown'})
             
             if self.use_openai:
-                response = openai.ChatCompletion.create(
-                    model="gpt-3.5-turbo",
-                    messages=[
-                        {"role": "system", "content": "You are a maintenance expert with deep knowledge of industrial equipment, manufacturer specifications, and maintenance standards. Provide accurate lifespan estimates based on real-world experience and manufacturer data."},
-                        {"role": "user", "content": prompt}
-                    ],
+                response = self.client.chat.completions.create(
+                    model=_LIFESPAN_MODEL,
+                    messages=[_LIFESPAN_SYSTEM_MESSAGE, {"role": "user", "content": prompt}],
                     temperature=0.1,
-                    max_tokens=50
+                    max_tokens=20,
+                    response_format={"type": "json_object"}
                 )
                 
-                result = response.choices[0].message.content.strip()
-                
-                # Try to extract a number from the response
-                if result.isdigit():
-                    lifespan = int(result)
-                    logger.info(f"✅ Found online lifespan: {lifespan} months")
-                    return lifespan
-                elif "UNKNOWN" in result.upper():
+                # JSON mode: {"months": n}, with null when the model can't tell
+                result = response.choices[0].message.content
+                try:
+                    months = orjson.loads(result).get("months")
+                except (orjson.JSONDecodeError, AttributeError):
+                    logger.warning("Could not parse lifespan from response: %s", result)
                     return None
-                else:
-                    # Try to extract number from text
-                    numbers = re.findall(r'\d+', result)
-                    if numbers:
-                        lifespan = int(numbers[0])
-                        logger.info(f"✅ Extracted lifespan from text: {lifespan} months")
-                        return lifespan
                 
-                logger.warning(f"Could not parse lifespan from response: {result}")
-                return None
+                if isinstance(months, int) and months > 0:
+                    logger.info("✅ Found online lifespan: %s months", months)
+                    return months
             
             return None
             
         except Exception as e:
-            logger.error(f"Error in OpenAI-only search: {e}")
+            logger.error("Error in OpenAI-only search: %s", e)
             return None
     
+    def _search_part_lifespan_online(self, part_name: str, machine_name: str, manufacturer: str = None) -> Optional[int]:
+        """
+        Cached lifespan lookup: memory, then the SQLite cache, then OpenAI
+        Web search isn't wired into this agent, so misses go to _search_part_lifespan_openai_only.
+        Returns lifespan in months, or None if not found
+        """
+        key = _online_lifespan_key(part_name, machine_name, manufacturer)
+        lifespan = self._cached_online_lifespan(key)
+        if lifespan is not None:
+            return lifespan
+        
+        embedding = self._embed_parts([(part_name, machine_name, manufacturer)])[0]
+        lifespan = self._similar_online_lifespan(embedding)
+        if lifespan is not None:
+            logger.info("⚡ Semantic lifespan cache hit: %s months", lifespan)
+            self._store_online_lifespan(key, lifespan)
+            return lifespan
+        
+        lifespan = self._search_part_lifespan_openai_only(part_name, machine_name, manufacturer)
+        if lifespan is not None:
+            self._store_online_lifespan(key, lifespan, embedding)
+        return lifespan
+    
+    def _search_part_lifespans_online(self, parts: List[Dict]) -> List[Optional[int]]:
+        """
+        Batched _search_part_lifespan_online for part info dicts (see _get_part_info_from_data)
+        Parts with the same cache key are looked up once; misses go to OpenAI
+        _LIFESPAN_BATCH_SIZE at a time, with the batches sent concurrently.
+        Returns lifespans in months in the order of parts, None where not found
+        """
+        keys = [_online_lifespan_key(part['part_name'], part['machine_name'], part['manufacturer']) for part in parts]
+        found, misses = {}, {}
+        for key, part in zip(keys, parts):
+            if key in found or key in misses:
+                continue
+            lifespan = self._cached_online_lifespan(key)
+            if lifespan is None:
+                misses[key] = part
+            else:
+                found[key] = lifespan
+        
+        # Without OpenAI there is nothing to embed or search: the cached answers are all there is
+        if not self.use_openai:
+            return [found.get(key) for key in keys]
+        
+        # Then parts described almost like one answered before
+        embeddings = dict(zip(misses, self._embed_parts(
+            [(part['part_name'], part['machine_name'], part['manufacturer']) for part in misses.values()]
+        )))
+        cached = len(found)
+        for key, embedding in embeddings.items():
+            lifespan = self._similar_online_lifespan(embedding)
+            if lifespan is not None:
+                found[key] = lifespan
+                self._store_online_lifespan(key, lifespan)
+                del misses[key]
+        
+        # One summary line per call rather than one per part
+        if logger.isEnabledFor(logging.INFO) and found:
+            logger.info("⚡ Online lifespans from cache: %s exact, %s similar", cached, len(found) - cached)
+        
+        if misses:
+            pending = list(misses.items())
+            batches = [pending[i:i + _LIFESPAN_BATCH_SIZE] for i in range(0, len(pending), _LIFESPAN_BATCH_SIZE)]
+            logger.info("🔍 Searching online for lifespans of %s distinct parts in %s request(s)", len(pending), len(batches))
+            with ThreadPoolExecutor(max_workers=min(_ONLINE_LOOKUP_WORKERS, len(batches))) as executor:
+                answers = executor.map(
+                    lambda batch: self._search_part_lifespans_openai_batch([part for _, part in batch]),
+                    batches
+                )
+                for batch, lifespans in zip(batches, answers):
+                    for (key, _), lifespan in zip(batch, lifespans):
+                        found[key] = lifespan
+                        if lifespan is not None:
+                            self._store_online_lifespan(key, lifespan, embeddings[key])
+            
+            if logger.isEnabledFor(logging.INFO):
+                searched = sum(found[key] is not None for key in misses)
+                logger.info("✅ Found online lifespans for %s of %s parts", searched, len(misses))
+        
+        return [found[key] for key in keys]
+    
+    def _embed_parts(self, parts: List[tuple]) -> List[Optional[List[float]]]:
+        """
+        Unit-length embeddings of (part_name, machine_name, manufacturer) descriptions for the semantic cache
+        None where unavailable
+        """
+        if not parts or not self.use_openai:
+            return [None] * len(parts)
+        
+        texts = [f"{part_name} | {machine_name} | {manufacturer or 'Unknown'}" for part_name, machine_name, manufacturer in parts]
+        return embed_texts(self.client, texts)
+    
+    def _similar_online_lifespan(self, embedding: Optional[List[float]]) -> Optional[int]:
+        """Online lifespan found earlier for a near-identical part description, if any"""
+        if embedding is None:
+            return None
+        cached = self._semantic_lifespans.lookup(embedding, _LIFESPAN_PROMPT_HASH)
+        return None if cached is None else int(cached)
+    
+    def _search_part_lifespans_openai_batch(self, parts: List[Dict]) -> List[Optional[int]]:
+        """
+        Lifespans for several parts from a single OpenAI request (no web search)
+        Returns lifespans in months in the order of parts, None where not found
+        """
+        lifespans = [None] * len(parts)
+        if not self.use_openai:
+            return lifespans
+        
+        listing = compact_json([
+            {"i": i, "part": part['part_name'], "machine": part['machine_name'], "manufacturer": part['manufacturer'] or 'Unknown'}
+            for i, part in enumerate(parts)
+        ])
+        try:
+            response = self.client.chat.completions.create(
+                model=_LIFESPAN_MODEL,
+                messages=[_LIFESPAN_SYSTEM_MESSAGE, {"role": "user", "content": listing}],
+                temperature=0.1,
+                max_tokens=20 * len(parts),
+                response_format={"type": "json_object"}
+            )
+            results = orjson.loads(response.choices[0].message.content).get("results")
+        except Exception as e:
+            logger.error("Error in batched OpenAI-only search: %s", e)
+            return lifespans
+        
+        for result in results if isinstance(results, list) else ():
+            if not isinstance(result, dict):
+                continue
+            i, months = result.get("i"), result.get("months")
+            if isinstance(i, int) and 0 <= i < len(parts) and isinstance(months, int) and months > 0:
+                lifespans[i] = months
+        
+        return lifespans
+    
+    def _cached_online_lifespan(self, key: tuple) -> Optional[int]:
+        """Online lifespan for a cache key from memory or the SQLite cache, if present and fresh"""
+        with self._online_lifespans_lock:
+            lifespan = self._online_lifespans.get(key)
+        if lifespan is not None:
+            return lifespan
+        
+        try:
+            with self._lifespan_db_lock:
+                row = self._lifespan_db.execute(
+                    "SELECT months FROM lifespans WHERE key = ? AND ts > ?",
+                    ("\x1f".join(key), time.time() - _LIFESPAN_TTL_SECONDS)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.error("❌ Error reading lifespan cache: %s", e)
+            return None
+        
+        if row:
+            with self._online_lifespans_lock:
+                self._online_lifespans[key] = row[0]
+            return row[0]
+        return None
+    
+    def _store_online_lifespan(self, key: tuple, lifespan: int, embedding: Optional[List[float]] = None):
+        """Remember a found online lifespan in memory and in the SQLite cache, and under its embedding if given"""
+        if embedding is not None:
+            self._semantic_lifespans.add(embedding, str(lifespan), _LIFESPAN_PROMPT_HASH)
+        
+        try:
+            with self._lifespan_db_lock:
+                with self._lifespan_db:
+                    self._lifespan_db.execute(
+                        "INSERT OR REPLACE INTO lifespans (key, months, ts) VALUES (?, ?, ?)",
+                        ("\x1f".join(key), lifespan, time.time())
+                    )
+        except sqlite3.Error as e:
+            logger.error("❌ Error writing lifespan cache: %s", e)
+        
+        with self._online_lifespans_lock:
+            self._online_lifespans[key] = lifespan
+    
+    def clear_lifespan_cache(self):
+        """Forget all remembered lifespans (online, similar-part and AI, in memory and on disk) so they are looked up again"""
+        self._lifespan_by_part.clear()
+        with self._online_lifespans_lock:
+            self._online_lifespans.clear()
+        try:
+            with self._lifespan_db_lock:
+                with self._lifespan_db:
+                    self._lifespan_db.execute("DELETE FROM lifespans")
+        except sqlite3.Error as e:
+            logger.error("❌ Error clearing lifespan cache: %s", e)
+        self._semantic_lifespans.clear()
+        self.ai_lifespan_lookup.clear_cache()
+    
+    @cached_property
+    def _lifespan_db(self) -> sqlite3.Connection:
+        """Connection to the persistent lifespan cache, shared by threads under _lifespan_db_lock"""
+        connection = sqlite3.connect(_LIFESPAN_DB_PATH, timeout=10, check_same_thread=False)
+        connection.execute("CREATE TABLE IF NOT EXISTS lifespans (key TEXT PRIMARY KEY, months INTEGER, ts REAL)")
+        return connection
+    
     def _get_part_info_from_data(self, part_id: int) -> Dict[str, Any]:
         """Get part information from the database"""
-        for part in self.data['spare_parts']:
-            if part.get('SPAREPARTID') == part_id:
-                # Find the associated machine
-                machine_id = part.get('ROLLINGSTOCKID')
-                machine = None
-                for m in self.data['machines']:
-                    if m.get('rollingstockId') == machine_id:
-                        machine = m
-                        break
-                
-                return {
-                    'part_name': part.get('NOTE', f'Part {part_id}'),
-                    'machine_name': machine.get('name', 'Unknown Machine') if machine else 'Unknown Machine',
-                    'manufacturer': machine.get('producer', 'Unknown') if machine else 'Unknown',
-                    'part_id': part_id
-                }
-        return None
+        part = self._parts_by_id.get(part_id)
+        if not part:
+            return None
+        
+        # Find the associated machine
+        machine = self._machines_by_rollingstock.get(part.get('ROLLINGSTOCKID'))
+        
+        return {
+            'part_name': part.get('NOTE', f'Part {part_id}'),
+            'machine_name': machine.get('name', 'Unknown Machine') if machine else 'Unknown Machine',
+            'manufacturer': machine.get('producer', 'Unknown') if machine else 'Unknown',
+            'part_id': part_id
+        }
+    
+    def warm_up(self):
+        """
+        Load fresh online lifespans from SQLite into memory and open the OpenAI connection
+        Meant to run in a background thread at startup, so the first command finds both ready.
+        """
+        try:
+            with self._lifespan_db_lock:
+                rows = self._lifespan_db.execute(
+                    "SELECT key, months FROM lifespans WHERE ts > ?",
+                    (time.time() - _LIFESPAN_TTL_SECONDS,)
+                ).fetchall()
+        except sqlite3.Error as e:
+            logger.error("❌ Error reading lifespan cache: %s", e)
+            rows = []
+        with self._online_lifespans_lock:
+            for key, months in rows:
+                self._online_lifespans.setdefault(tuple(key.split("\x1f")), months)
+        
+        if self.use_openai:
+            # Any cheap request will do: it pays for the TLS handshake and leaves a keep-alive connection in the pool
+            try:
+                self.client.with_options(max_retries=0).models.list(timeout=_WARMUP_TIMEOUT)
+            except Exception as e:
+                logger.warning("OpenAI warm-up failed: %s", e)
+        
+        logger.info("🔥 Warm-up done: %s online lifespans loaded", len(rows))
+    
+    def warm_lifespan_cache(self) -> int:
+        """
+        Look up AI lifespans for every part concurrently so later requests are served from cache
+        Returns the number of parts looked up
+        """
+        part_ids = [part.get('SPAREPARTID') for part in self.data['spare_parts'] if part.get('SPAREPARTID') is not None]
+        return self._prefetch_smart_lifespans(part_ids)
+    
+    def _prefetch_smart_lifespans(self, part_ids) -> int:
+        """
+        Fill the per-part lifespan cache for the given parts, looking up the missing ones concurrently
+        Returns the number of parts looked up
+        """
+        part_infos = {}
+        for part_id in part_ids:
+            if part_id in self._lifespan_by_part or part_id in part_infos:
+                continue
+            part_infos[part_id] = self._get_part_info_from_data(part_id)
+        
+        parts = {part_id: part_info for part_id, part_info in part_infos.items() if part_info}
+        if parts:
+            # Catalogs list the same part under many IDs: look up each name, manufacturer and machine once
+            keys = {
+                part_id: _online_lifespan_key(part_info['part_name'], part_info['machine_name'], part_info['manufacturer'])
+                for part_id, part_info in parts.items()
+            }
+            distinct = {}
+            for part_id, key in keys.items():
+                distinct.setdefault(key, parts[part_id])
+            logger.info("🔥 Warming AI lifespan cache for %s parts (%s distinct)", len(parts), len(distinct))
+            lifespans = dict(zip(distinct, self.ai_lifespan_lookup.get_ai_lifespans(list(distinct.values()))))
+            for part_id, key in keys.items():
+                self._lifespan_by_part[part_id] = lifespans[key] or DEFAULT_PART_LIFESPANS.get(part_id, 12)
+        
+        # Parts missing from the data get the default, as in get_smart_part_lifespan
+        for part_id in part_infos.keys() - parts.keys():
+            self._lifespan_by_part[part_id] = DEFAULT_PART_LIFESPANS.get(part_id, 12)
+        
+        return len(parts)
+    
+    def _prefetch_online_lifespans(self, part_ids) -> Dict[int, Optional[int]]:
+        """
+        Online lifespans for the given parts, searched in batches
+        Parts with the same name, manufacturer and machine share one search.
+        """
+        part_infos = {}
+        for part_id in part_ids:
+            if part_id in part_infos:
+                continue
+            part_info = part_infos[part_id] = self._get_part_info_from_data(part_id)
+            if not part_info:
+                logger.warning("Part %s not found in database", part_id)
+        
+        parts = {part_id: part_info for part_id, part_info in part_infos.items() if part_info}
+        lifespans = dict(zip(parts, self._search_part_lifespans_online(list(parts.values()))))
+        return {part_id: lifespans.get(part_id) for part_id in part_infos}
     
     def get_online_part_lifespan(self, part_id: int) -> Optional[int]:
         """
@@ -778,10 +1291,10 @@ Respond with ONLY a number representing the lifespan in months, or 'UNKNOWN' if
         """
         part_info = self._get_part_info_from_data(part_id)
         if not part_info:
-            logger.warning(f"Part {part_id} not found in database")
+            logger.warning("Part %s not found in database", part_id)
             return None
         
-        logger.info(f"🔍 Searching online for lifespan of {part_info['part_name']} on {part_info['machine_name']}")
+        logger.info("🔍 Searching online for lifespan of %s on %s", part_info['part_name'], part_info['machine_name'])
         
         lifespan = self._search_part_lifespan_online(
             part_info['part_name'],
@@ -790,23 +1303,39 @@ Respond with ONLY a number representing the lifespan in months, or 'UNKNOWN' if
         )
         
         if lifespan:
-            logger.info(f"✅ Found online lifespan for part {part_id}: {lifespan} months")
+            logger.info("✅ Found online lifespan for part %s: %s months", part_id, lifespan)
         else:
-            logger.warning(f"❌ No online lifespan found for part {part_id}, using default")
+            logger.warning("❌ No online lifespan found for part %s, using default", part_id)
         
         return lifespan
     
+    def get_smart_part_lifespans(self, part_ids: List[int]) -> Dict[int, int]:
+        """
+        get_smart_part_lifespan for several parts; the ones not yet known are looked up concurrently
+        Returns lifespans in months by part ID
+        """
+        part_ids = list(dict.fromkeys(part_ids))
+        self._prefetch_smart_lifespans(part_ids)
+        return {part_id: self._lifespan_by_part[part_id] for part_id in part_ids}
+    
     def get_smart_part_lifespan(self, part_id: int) -> int:
         """
-        Get part lifespan using AI-powered lookup
+        Get part lifespan using AI-powered lookup, remembered per part
         Returns lifespan in months
         """
+        lifespan = self._lifespan_by_part.get(part_id)
+        if lifespan is None:
+            lifespan = self._lifespan_by_part[part_id] = self._lookup_smart_part_lifespan(part_id)
+        return lifespan
+    
+    def _lookup_smart_part_lifespan(self, part_id: int) -> int:
+        """Uncached get_smart_part_lifespan"""
         part_info = self._get_part_info_from_data(part_id)
         if not part_info:
-            logger.warning(f"Part {part_id} not found in database")
+            logger.warning("Part %s not found in database", part_id)
             return DEFAULT_PART_LIFESPANS.get(part_id, 12)  # 12 months default
         
-        logger.info(f"🔍 AI analyzing lifespan for part {part_id}: {part_info['part_name']}")
+        logger.info("🔍 AI analyzing lifespan for part %s: %s", part_id, part_info['part_name'])
         
         # Use AI-powered lifespan lookup
         lifespan = self.ai_lifespan_lookup.get_ai_lifespan(
@@ -816,12 +1345,12 @@ Respond with ONLY a number representing the lifespan in months, or 'UNKNOWN' if
         )
         
         if lifespan:
-            logger.info(f"✅ AI found lifespan for part {part_id}: {lifespan} months")
+            logger.info("✅ AI found lifespan for part %s: %s months", part_id, lifespan)
             return lifespan
         else:
             # If AI can't determine, use default
             default_lifespan = DEFAULT_PART_LIFESPANS.get(part_id, 12)  # 12 months default
-            logger.info(f"📋 AI could not determine lifespan for part {part_id}, using default: {default_lifespan} months")
+            logger.info("📋 AI could not determine lifespan for part %s, using default: %s months", part_id, default_lifespan)
             return default_lifespan
     
     def get_ai_part_lifespan(self, part_id: int) -> Optional[int]:
@@ -831,10 +1360,10 @@ Respond with ONLY a number representing the lifespan in months, or 'UNKNOWN' if
         """
         part_info = self._get_part_info_from_data(part_id)
         if not part_info:
-            logger.warning(f"Part {part_id} not found in database")
+            logger.warning("Part %s not found in database", part_id)
             return None
         
-        logger.info(f"🔍 AI analyzing lifespan for part {part_id}: {part_info['part_name']}")
+        logger.info("🔍 AI analyzing lifespan for part %s: %s", part_id, part_info['part_name'])
         
         # Use AI-powered lifespan lookup
         lifespan = self.ai_lifespan_lookup.get_ai_lifespan(
@@ -844,23 +1373,75 @@ Respond with ONLY a number representing the lifespan in months, or 'UNKNOWN' if
         )
         
         if lifespan:
-            logger.info(f"✅ AI found lifespan for part {part_id}: {lifespan} months")
+            logger.info("✅ AI found lifespan for part %s: %s months", part_id, lifespan)
         else:
-            logger.warning(f"❌ AI could not determine lifespan for part {part_id}")
+            logger.warning("❌ AI could not determine lifespan for part %s", part_id)
         
         return lifespan
 
+    def get_ai_part_lifespans(self, part_ids: List[int]) -> Dict[int, Optional[int]]:
+        """
+        get_ai_part_lifespan for several parts, looked up concurrently
+        Returns lifespans in months by part ID, None where not found
+        """
+        part_infos = {}
+        for part_id in part_ids:
+            if part_id in part_infos:
+                continue
+            part_info = part_infos[part_id] = self._get_part_info_from_data(part_id)
+            if not part_info:
+                logger.warning("Part %s not found in database", part_id)
+        
+        parts = {part_id: part_info for part_id, part_info in part_infos.items() if part_info}
+        lifespans = dict(zip(parts, self.ai_lifespan_lookup.get_ai_lifespans(list(parts.values())))) if parts else {}
+        return {part_id: lifespans.get(part_id) for part_id in part_infos}
+
+def _print_json(obj):
+    """Print indented JSON, encoded by orjson straight to stdout's byte stream"""
+    sys.stdout.flush()  # keep it after text already printed
+    sys.stdout.buffer.write(orjson.dumps(obj, option=orjson.OPT_INDENT_2) + b"\n")
+    sys.stdout.buffer.flush()
+
 # CLI Interface for the Structured AI Agent
 class StructuredAI_CLI:
-    def __init__(self):
+    def __init__(self, refresh_cache: bool = False):
         self.agent = None
         self.running = True
+        self.refresh_cache = refresh_cache
+        # Background agent warm-up started by initialize_agent, until the first command waits for it
+        self._warmup: Optional[threading.Thread] = None
+        
+        # Command name -> handler, with every alias of a command mapping to the same handler
+        self._commands = {}
+        for names, handler in (
+            (('quit', 'q', 'exit'), self._cmd_quit),
+            (('help', 'h'), self._cmd_help),
+            (('metrics', 'm'), self._cmd_metrics),
+            (('alerts', 'a'), self._cmd_alerts),
+            (('equipment', 'e'), self._cmd_equipment),
+            (('analyze',), self._cmd_analyze),
+            (('costs', 'c'), self._cmd_costs),
+            (('predictions', 'p'), self._cmd_predictions),
+            (('duechecks', 'due'), self._cmd_due),
+            (('replacementpredictions', 'reppred'), self._cmd_reppred),
+            (('lifespan',), self._cmd_lifespan),
+            (('chat',), self._cmd_chat),
+            (('reload',), self._cmd_reload),
+        ):
+            for name in names:
+                self._commands[name] = handler
     
     def initialize_agent(self):
         """Initialize the Structured AI Agent"""
         try:
             print("🤖 Initializing Structured AI Agent...")
             self.agent = StructuredSparePartsAgent()
+            if self.refresh_cache:
+                self.agent.clear_lifespan_cache()
+                print("🧹 Lifespan cache cleared")
+            # Connect and load caches while the user types the first command
+            self._warmup = threading.Thread(target=self.agent.warm_up, daemon=True)
+            self._warmup.start()
             print("✅ Structured AI Agent ready!")
             return True
         except Exception as e:
@@ -885,10 +1466,11 @@ class StructuredAI_CLI:
   predict          - Get part replacement predictions
   reppred          - Get replacement predictions with detailed analysis
   due              - Get parts due for replacement/check
-  lifespan <id>    - AI-powered part lifespan analysis (e.g., lifespan 3)
+  lifespan <id>... - AI-powered part lifespan analysis (e.g., lifespan 3 or lifespan 3 4 5)
 
 💬 Chat & General:
   chat <message>   - Chat with AI about maintenance
+  reload           - Pick up changes to the data file
   help             - Show this help message
   quit             - Exit the application
 
@@ -903,6 +1485,7 @@ class StructuredAI_CLI:
         """Run the CLI"""
         if not self.initialize_agent():
             return
+        self._enable_completion()
         
         print("\n🤖 Structured AI Agent CLI")
         print("Type 'help' for available commands")
@@ -918,104 +1501,147 @@ class StructuredAI_CLI:
                 
                 parts = command.split()
                 cmd = parts[0].lower()
-                args = parts[1:] if len(parts) > 1 else []
-                
-                if cmd in ['quit', 'q', 'exit']:
-                    print("👋 Goodbye!")
-                    self.running = False
-                
-                elif cmd in ['help', 'h']:
-                    self.show_help()
-                
-                elif cmd in ['metrics', 'm']:
-                    print("\n📊 Getting dashboard metrics...")
-                    metrics = self.agent.get_dashboard_metrics()
-                    print(json.dumps(metrics, indent=2))
-                
-                elif cmd in ['alerts', 'a']:
-                    print("\n🚨 Getting maintenance alerts...")
-                    alerts = self.agent.get_maintenance_alerts()
-                    print(json.dumps(alerts, indent=2))
-                
-                elif cmd in ['equipment', 'e']:
-                    if args:
-                        try:
-                            equipment_id = int(args[0])
-                            print(f"\n🔍 Getting equipment {equipment_id} analysis...")
-                            analysis = self.agent.get_equipment_analysis(equipment_id)
-                            print(json.dumps(analysis, indent=2))
-                        except ValueError:
-                            print("❌ Please provide a valid equipment ID")
-                    else:
-                        print("❌ Please provide equipment ID")
-                
-                elif cmd in ['analyze']:
-                    if args:
-                        machine_id = args[0]
-                        print(f"\n🔍 Analyzing machine {machine_id}...")
-                        analysis = self.agent.get_machine_analysis(machine_id)
-                        print(json.dumps(analysis, indent=2))
-                    else:
-                        print("❌ Please provide a machine ID")
-                
-                elif cmd in ['costs', 'c']:
-                    print("\n💰 Getting cost analysis...")
-                    analysis = self.agent.get_cost_analysis()
-                    print(json.dumps(analysis, indent=2))
-                
-                elif cmd in ['predictions', 'p']:
-                    print("\n🔮 Getting predictions...")
-                    predictions = self.agent.get_predictions()
-                    print(json.dumps(predictions, indent=2))
-                
-                elif cmd in ['duechecks', 'due']:
-                    print("\n⏰ Getting due part checks...")
-                    due = self.agent.get_due_part_checks()
-                    print(json.dumps(due, indent=2))
+                args = parts[1:]
                 
-                elif cmd in ['replacementpredictions', 'reppred']:
-                    print("\n🔁 Getting replacement predictions...")
-                    preds = self.agent.predict_part_replacements()
-                    print(json.dumps(preds, indent=2))
-                
-                elif cmd in ['lifespan']:
-                    if args:
-                        try:
-                            part_id = int(args[0])
-                            print(f"\n🔍 AI analyzing lifespan for part {part_id}...")
-                            lifespan = self.agent.get_ai_part_lifespan(part_id)
-                            if lifespan is not None:
-                                print(f"✅ Part {part_id} AI lifespan: {lifespan} months")
-                            else:
-                                print(f"❌ AI could not determine lifespan for part {part_id}, using default.")
-                        except ValueError:
-                            print("❌ Please provide a valid part ID")
-                    else:
-                        print("❌ Please provide a part ID")
-                
-                elif cmd in ['chat']:
-                    if args:
-                        print(f"\n💬 Chatting with AI about: {args[0]}")
-                        # This is a placeholder for a real chat function.
-                        # For now, it will just return a generic response.
-                        print("This is a placeholder for a real chat function.")
-                        print("The AI would typically respond to your message here.")
-                    else:
-                        print("❌ Please provide a message to chat about.")
-                
-                else:
+                handler = self._commands.get(cmd)
+                if handler is None:
                     print(f"❌ Unknown command: {cmd}")
                     print("Type 'help' for available commands")
+                    continue
+                
+                if handler != self._cmd_quit:
+                    self._finish_warmup()
+                
+                # Handlers return the structured JSON to print, or None when they printed their own output
+                result = handler(args)
+                if result is not None:
+                    _print_json(result)
             
             except KeyboardInterrupt:
                 print("\n👋 Goodbye!")
                 self.running = False
             except Exception as e:
                 print(f"❌ Error: {e}")
+    
+    def _finish_warmup(self):
+        """Wait for the startup warm-up if it is still running, so commands don't race it for the client"""
+        if self._warmup is None:
+            return
+        if self._warmup.is_alive():
+            print("⏳ Warming up...")
+            self._warmup.join()
+        self._warmup = None
+    
+    def _enable_completion(self):
+        """Tab-complete command names where readline is available (it isn't on Windows)"""
+        try:
+            import readline
+        except ImportError:
+            return
+        
+        names = sorted(self._commands)
+        
+        def complete(text: str, state: int) -> Optional[str]:
+            matches = [name for name in names if name.startswith(text)]
+            return matches[state] if state < len(matches) else None
+        
+        readline.set_completer(complete)
+        readline.parse_and_bind('tab: complete')
+    
+    @staticmethod
+    def _int_args(args: List[str], what: str, missing: str) -> Optional[List[int]]:
+        """Parse integer ID arguments, printing the problem and returning None if missing or invalid"""
+        if not args:
+            print(f"❌ Please provide {missing}")
+            return None
+        try:
+            return [int(arg) for arg in args]
+        except ValueError:
+            print(f"❌ Please provide a valid {what}")
+            return None
+    
+    def _cmd_quit(self, args: List[str]):
+        print("👋 Goodbye!")
+        self.running = False
+    
+    def _cmd_help(self, args: List[str]):
+        self.show_help()
+    
+    def _cmd_metrics(self, args: List[str]) -> Dict[str, Any]:
+        print("\n📊 Getting dashboard metrics...")
+        return self.agent.get_dashboard_metrics()
+    
+    def _cmd_alerts(self, args: List[str]) -> Dict[str, Any]:
+        print("\n🚨 Getting maintenance alerts...")
+        return self.agent.get_maintenance_alerts()
+    
+    def _cmd_equipment(self, args: List[str]) -> Optional[Dict[str, Any]]:
+        equipment_ids = self._int_args(args[:1], "equipment ID", "equipment ID")
+        if equipment_ids is None:
+            return None
+        print(f"\n🔍 Getting equipment {equipment_ids[0]} analysis...")
+        return self.agent.get_equipment_analysis(equipment_ids[0])
+    
+    def _cmd_analyze(self, args: List[str]) -> Optional[Dict[str, Any]]:
+        if not args:
+            print("❌ Please provide a machine ID")
+            return None
+        machine_id = args[0]
+        print(f"\n🔍 Analyzing machine {machine_id}...")
+        return self.agent.get_machine_analysis(machine_id)
+    
+    def _cmd_costs(self, args: List[str]) -> Dict[str, Any]:
+        print("\n💰 Getting cost analysis...")
+        return self.agent.get_cost_analysis()
+    
+    def _cmd_predictions(self, args: List[str]) -> Dict[str, Any]:
+        print("\n🔮 Getting predictions...")
+        return self.agent.get_predictions()
+    
+    def _cmd_due(self, args: List[str]) -> list:
+        print("\n⏰ Getting due part checks...")
+        return self.agent.get_due_part_checks()
+    
+    def _cmd_reppred(self, args: List[str]) -> list:
+        print("\n🔁 Getting replacement predictions...")
+        return self.agent.predict_part_replacements()
+    
+    def _cmd_lifespan(self, args: List[str]):
+        part_ids = self._int_args(args, "part ID", "a part ID")
+        if part_ids is None:
+            return
+        print(f"\n🔍 AI analyzing lifespan for part {', '.join(map(str, part_ids))}...")
+        # Several parts are looked up concurrently
+        for part_id, lifespan in self.agent.get_ai_part_lifespans(part_ids).items():
+            if lifespan is not None:
+                print(f"✅ Part {part_id} AI lifespan: {lifespan} months")
+            else:
+                print(f"❌ AI could not determine lifespan for part {part_id}, using default.")
+    
+    def _cmd_reload(self, args: List[str]):
+        if self.agent.reload_data():
+            print("🔄 Data reloaded; derived indexes and cached lifespans will be rebuilt")
+        else:
+            print("✅ Data file unchanged")
+    
+    def _cmd_chat(self, args: List[str]):
+        if not args:
+            print("❌ Please provide a message to chat about.")
+            return
+        print(f"\n💬 Chatting with AI about: {args[0]}")
+        # This is a placeholder for a real chat function.
+        # For now, it will just return a generic response.
+        print("This is a placeholder for a real chat function.")
+        print("The AI would typically respond to your message here.")
 
 def main():
     """Main function"""
-    cli = StructuredAI_CLI()
+    parser = argparse.ArgumentParser(description="Structured AI Agent CLI")
+    parser.add_argument("--refresh-cache", action="store_true",
+                        help="forget cached part lifespans so they are looked up again")
+    args = parser.parse_args()
+    
+    cli = StructuredAI_CLI(refresh_cache=args.refresh_cache)
     cli.run()
 
 if __name__ == "__main__":